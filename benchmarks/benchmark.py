@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+from io import StringIO
+from time import perf_counter
+
+from pdp8.core import PDP8, HALTED
+from pdp8.fastpal import FastPal
+from pdp8.pal import Pal
+from pdp8.tracing import NullTracer
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+VERSION = 1
+
+# Synthetic workloads share a skeleton: the body is repeated until the page is
+# nearly full, and runs 4096 times for each count of OUTER below zero.
+SKELETON = """
+*20
+COUNT,  0
+OUTER,  %04o
+A,      1234
+B,      0
+C,      0
+M,      0707
+P1,     A
+P2,     M
+P3,     B
+P4,     C
+PSUB,   SUB
+*200
+START,  CLA CLL
+LOOP,   %s
+        ISZ COUNT
+        JMP LOOP
+        ISZ OUTER
+        JMP LOOP
+        HLT
+SUB,    0
+        JMP I SUB
+$
+"""
+
+BODIES = {
+    'opr': ['CLA CLL', 'CMA IAC', 'RAL', 'RTR', 'CML', 'SZA', 'IAC', 'SNL CLA', 'RAR', 'CMA',
+            'SPA', 'IAC', 'RTL', 'SMA CLA', 'NOP'],
+    'mri': ['TAD A', 'AND M', 'DCA B', 'TAD B', 'TAD C', 'DCA A', 'ISZ C', 'NOP'],
+    'indirect': ['TAD I P1', 'AND I P2', 'DCA I P3', 'TAD I P3', 'ISZ I P4', 'NOP', 'JMS I PSUB', 'CLA'],
+    'iot': ['GTF', 'CLA', 'SKON', 'NOP', 'IOF', 'TSF', 'NOP', 'TCF', 'KSF', 'NOP', 'KCC'],
+}
+
+# tapes for the data programs that read one
+TAPES = {'copy': 'HELLO, WORLD.'}
+
+
+def synthetic(body, outer):
+    lines = (body * (96 // len(body)))[:96]
+    return (SKELETON % (-outer & 0o7777, '\n        '.join(lines))).splitlines()
+
+
+# name -> (source lines, tape) for every workload
+def workloads(scale=1):
+    loads = {}
+    for filename in sorted(glob.glob(os.path.join(DATA, '*.pal'))):
+        name = os.path.basename(filename)[:-4]
+        with open(filename) as f:
+            loads[name] = (f.read().splitlines(), TAPES.get(name, ''))
+    for (name, body) in BODIES.items():
+        loads[name] = (synthetic(body, scale), '')
+    return loads
+
+
+def assemble(assembler, pdp8, source):
+    with contextlib.redirect_stdout(StringIO()):
+        assembler(pdp8).assemble(source)
+    pdp8.tracer = NullTracer()
+
+
+# Runs a program from its freshly assembled image over and over until at least
+# minimum instructions have been executed, timing only the calls to run, and
+# returns the best rate of repeats such measurements.
+def run_rate(source, tape='', translate=False, minimum=200000, repeats=3):
+    pdp8 = PDP8()
+    assemble(Pal, pdp8, source)
+    image = pdp8.snapshot()
+    best = 0.0
+    for _ in range(repeats):
+        executed = 0
+        elapsed = 0.0
+        while executed < minimum:
+            pdp8.restore(image)
+            pdp8.tape_punch.replace('')
+            with contextlib.redirect_stdout(StringIO()):
+                began = perf_counter()
+                result = pdp8.run(start=0o200, tape=tape, translate=translate)
+                elapsed += perf_counter() - began
+            if result.status != HALTED:
+                raise ValueError('benchmark did not halt: %s' % result.status)
+            executed += result.instructions
+        best = max(best, executed / elapsed)
+    return best
+
+
+def assemble_rate(assembler, source, repeats=3):
+    best = 0.0
+    for _ in range(repeats):
+        began = perf_counter()
+        assemble(assembler, PDP8(), source)
+        best = max(best, len(source) / (perf_counter() - began))
+    return best
+
+
+# A large source of unique labels, MRIs, OPRs and IOTs, filling pages 1 to 30.
+def assembler_source(pages=30):
+    lines = []
+    for page in range(1, pages + 1):
+        lines.append('*%o' % (page * 0o200))
+        for n in range(0, 120, 8):
+            label = 'L%dN%d' % (page, n)
+            lines += ['%s,  CLA CLL   / start of a group' % label,
+                      '        TAD %sD' % label,
+                      '        SZA CLA',
+                      '        JMP .-2',
+                      '        TSF',
+                      '        JMS I %sD' % label,
+                      '        ISZ %s' % label,
+                      '%sD,  %o' % (label, n)]
+    return lines + ['$']
+
+
+def measure(scale=1, minimum=200000, repeats=3, only=None):
+    results = {}
+    for (name, (source, tape)) in workloads(scale).items():
+        for (mode, translate) in [('fast', False), ('translated', True)]:
+            key = 'run/%s/%s' % (mode, name)
+            if only is None or only in key:
+                results[key] = run_rate(source, tape, translate, minimum, repeats)
+    source = assembler_source()
+    for assembler in [Pal, FastPal]:
+        key = 'assemble/%s' % assembler.__name__
+        if only is None or only in key:
+            results[key] = assemble_rate(assembler, source, repeats)
+    return results
+
+
+# the benchmarks that have slowed by more than threshold (a fraction) since the baseline
+def regressions(baseline, results, threshold):
+    slower = {}
+    for (key, rate) in sorted(results.items()):
+        if key in baseline and rate < baseline[key] * (1 - threshold):
+            slower[key] = (baseline[key], rate)
+    return slower
+
+
+def report(baseline, results):
+    lines = ['%-28s %14s %14s %8s' % ('benchmark', 'baseline', 'now', 'change')]
+    for (key, rate) in sorted(results.items()):
+        if key in baseline:
+            change = '%+7.1f%%' % (100.0 * (rate / baseline[key] - 1))
+            lines.append('%-28s %14.0f %14.0f %8s' % (key, baseline[key], rate, change))
+        else:
+            lines.append('%-28s %14s %14.0f' % (key, '-', rate))
+    return lines
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Measures emulated instructions and assembled lines per second.')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare with the results in this JSON file')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--threshold', type=float, default=0.10, help='the slowdown that fails, as a fraction')
+    parser.add_argument('--scale', type=int, default=1, help='multiplies the length of the synthetic loops')
+    parser.add_argument('--minimum', type=int, default=200000, help='instructions to run for each measurement')
+    parser.add_argument('--repeats', type=int, default=3, help='measurements of each benchmark; the best is kept')
+    parser.add_argument('--only', help='run only the benchmarks whose names contain this')
+    options = parser.parse_args(arguments)
+    if options.save and not options.baseline:
+        parser.error('--save needs --baseline')
+    results = measure(options.scale, options.minimum, options.repeats, options.only)
+    document = {'version': VERSION, 'python': platform.python_version(), 'results': results}
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+    baseline = {}
+    if options.baseline and not options.save:
+        with open(options.baseline) as f:
+            baseline = json.load(f)['results']
+    for line in report(baseline, results):
+        print(line)
+    if options.save:
+        with open(options.baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        return 0
+    slower = regressions(baseline, results, options.threshold)
+    for (key, (before, now)) in slower.items():
+        print('%s regressed: %.0f -> %.0f per second' % (key, before, now))
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
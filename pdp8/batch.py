@@ -0,0 +1,151 @@
+import numpy
+
+WORDS = 4096
+MASK = 0o7777
+
+
+# Runs many PDP8s in lockstep, one lane per machine. Each step fetches and
+# decodes every running lane at once, then applies each instruction class to
+# the lanes that selected it, so Python dispatch is paid once per step rather
+# than once per machine. Only the teleprinter punch is supported as a device.
+class PDP8Batch(object):
+    def __init__(self, lanes):
+        self.lanes = lanes
+        self.memory = numpy.zeros((lanes, WORDS), dtype=numpy.uint16)
+        self.pc = numpy.zeros(lanes, dtype=numpy.int64)
+        self.accumulator = numpy.zeros(lanes, dtype=numpy.int64)
+        self.link = numpy.zeros(lanes, dtype=numpy.int64)
+        self.running = numpy.zeros(lanes, dtype=bool)
+        self.punchflag = numpy.zeros(lanes, dtype=numpy.int64)
+        self.executed = numpy.zeros(lanes, dtype=numpy.int64)
+        self.outputs = [[] for _ in range(lanes)]
+        self.ops = [self.andi, self.tad, self.isz, self.dca, self.jms, self.jmp, self.iot, self.opr]
+
+    # loads the same image (such as InstructionPlanter.code) into every lane
+    def load(self, image):
+        self.memory[:, :len(image)] = numpy.asarray(image, dtype=numpy.int64) & MASK
+
+    def output(self, lane):
+        return ''.join(self.outputs[lane])
+
+    def run(self, start=None, max_steps=None):
+        if start is not None:
+            self.pc[:] = start
+        self.running[:] = True
+        steps = 0
+        while self.running.any():
+            if max_steps is not None and steps >= max_steps:
+                break
+            self.step()
+            steps += 1
+        return steps
+
+    def step(self):
+        rows = numpy.flatnonzero(self.running)
+        pc = self.pc[rows]
+        instruction = self.memory[rows, pc].astype(numpy.int64)
+        op = instruction >> 9
+        address = (instruction & 0o0177) | numpy.where(instruction & 0o0200, 0, pc & 0o7600)
+        indirect = (instruction & 0o0400) != 0
+        indirect &= op < 6
+        address[indirect] = self.memory[rows[indirect], address[indirect]]
+        self.pc[rows] = pc + 1
+        self.executed[rows] += 1
+        for (code, execute) in enumerate(self.ops):
+            selected = op == code
+            if selected.any():
+                execute(rows[selected], address[selected], instruction[selected])
+
+    def andi(self, rows, address, instruction):
+        self.accumulator[rows] &= self.memory[rows, address]
+
+    def tad(self, rows, address, instruction):
+        self.add_12_bits(rows, self.memory[rows, address])
+
+    def add_12_bits(self, rows, increment):
+        total = self.accumulator[rows] + increment
+        self.link[rows] = total > MASK
+        self.accumulator[rows] = total & MASK
+
+    def isz(self, rows, address, instruction):
+        contents = (self.memory[rows, address] + 1) & MASK
+        self.memory[rows, address] = contents
+        self.pc[rows] += contents == 0
+
+    def dca(self, rows, address, instruction):
+        self.memory[rows, address] = self.accumulator[rows]
+        self.accumulator[rows] = 0
+
+    def jms(self, rows, address, instruction):
+        self.memory[rows, address] = self.pc[rows] & MASK
+        self.pc[rows] = address + 1
+
+    def jmp(self, rows, address, instruction):
+        self.pc[rows] = address
+
+    def iot(self, rows, address, instruction):
+        if ((instruction & 0o0770) != 0o0040).any():
+            raise ValueError('PDP8Batch only supports the teleprinter punch')
+        io_op = instruction & 0o0007
+        skip = ((io_op & 1) != 0) & (self.punchflag[rows] != 0)
+        self.pc[rows] += skip
+        self.punchflag[rows[(io_op & 2) != 0]] = 0
+        punching = rows[(io_op & 4) != 0]
+        for lane in punching:
+            if self.accumulator[lane] != 0:
+                self.outputs[lane].append(chr(self.accumulator[lane] & 0o377))
+        self.punchflag[punching] = 1
+
+    def opr(self, rows, address, instruction):
+        group1 = (instruction & 0o0400) == 0
+        group2 = ~group1 & ((instruction & 0o0001) == 0)
+        if not (group1 | group2).all():
+            raise ValueError('Unknown opcode in instruction 0o%o' % instruction[~(group1 | group2)][0])
+        if group1.any():
+            self.group1(rows[group1], instruction[group1])
+        if group2.any():
+            self.group2(rows[group2], instruction[group2])
+
+    # Mirrors PDP8.group1, applying each micro-operation to the lanes whose instruction has its bit set.
+    def group1(self, rows, instruction):
+        ac = self.accumulator[rows]
+        link = self.link[rows]
+        ac[(instruction & 0o0200) != 0] = 0
+        link[(instruction & 0o0100) != 0] = 0
+        ac ^= numpy.where(instruction & 0o0040, MASK, 0)
+        link ^= (instruction & 0o0020) != 0
+        iac = (instruction & 0o0001) != 0
+        ac += iac
+        link[iac] = ac[iac] > MASK
+        ac &= MASK
+        twice = (instruction & 0o0002) != 0
+        for (bit, rotate) in ((0o0010, rotate_right), (0o0004, rotate_left)):
+            selected = (instruction & bit) != 0
+            for passes in (selected, selected & twice):
+                ac[passes], link[passes] = rotate(ac[passes], link[passes])
+        self.accumulator[rows] = ac
+        self.link[rows] = link
+
+    # Mirrors PDP8.group2.
+    def group2(self, rows, instruction):
+        ac = self.accumulator[rows]
+        link = self.link[rows]
+        negative = (ac & 0o4000) != 0
+        zero = ac == 0
+        or_skip = ((negative & ((instruction & 0o0100) != 0)) |
+                   (zero & ((instruction & 0o0040) != 0)) |
+                   ((link == 1) & ((instruction & 0o0020) != 0)))
+        and_skip = ((~negative | ((instruction & 0o0100) == 0)) &
+                    (~zero | ((instruction & 0o0040) == 0)) &
+                    ((link == 0) | ((instruction & 0o0020) == 0)))
+        self.pc[rows] += numpy.where(instruction & 0o0010, and_skip, or_skip)
+        self.accumulator[rows[(instruction & 0o0200) != 0]] = 0
+        self.running[rows[(instruction & 0o0002) != 0]] = False
+
+
+def rotate_right(ac, link):
+    return (ac >> 1) | (link << 11), ac & 1
+
+
+def rotate_left(ac, link):
+    return ((ac << 1) & MASK) | link, ac >> 11
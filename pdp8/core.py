@@ -1,5 +1,12 @@
-from io import StringIO
+from array import array
+from collections import namedtuple
+from itertools import count
+from time import monotonic
+from pdp8.microcode import GROUP1, SKIPS, skip_state
+from pdp8.devices import PROCESSOR, Processor, Reader, Punch, MemoryExtension, unknown_device
+from pdp8.snapshot import Snapshot
 from pdp8.tracing import NullTracer
+from pdp8.translator import BlockTranslator, direct_address, instruction_cycles
 
 
 def octal(string):
@@ -23,6 +30,21 @@ Z_BIT = octal('0200')
 I_BIT = octal('0400')
 
 
+MAX_RUN = 2 ** 62
+CHECK_INTERVAL = 10000  # instructions between checks of a run's deadline
+
+# memory cycles for each opcode, as listed in pal.py; indirect MRIs take one more
+CYCLES = [2, 2, 2, 2, 2, 1, 1, 1]
+
+HALTED = 'halted'
+BUDGET_EXHAUSTED = 'budget exhausted'
+TIMED_OUT = 'timed out'
+STEPPED = 'stepped'
+STOPPED = 'stopped'
+
+RunResult = namedtuple('RunResult', ['status', 'instructions', 'cycles'])
+
+
 class PDP8:
     # TODO simplify these, use constants rather than calculating?
     W_BITS = 12                 # number of bits in a word
@@ -33,22 +55,44 @@ class PDP8:
     V_MASK = 2 ** V_BITS - 1    # mask for instruction data
     MAX = 2 ** (V_BITS - 1)
 
-    def __init__(self):
-        self.memory = 2 ** self.W_BITS * [0]
+    def __init__(self, fields=1):
+        self.fields = fields  # 4K fields of memory; more than one needs the memory extension
+        self._memory = array('H', fields * 2 ** self.W_BITS * [0])  # 12-bit words, masked when stored
         self.pc = 0
         self.accumulator = 0
         self.link = 0
         self.running = False
+        self.halted = False
+        self.stopped = False  # set, along with clearing running, to end a run early
+        self.cycles = 0
         self.debugging = False
         self.stepping = False
         self.ia = None
         self.instruction = None
-        self.tape = StringIO('')
         self.READER1 = 0o03
         self.PUNCH1 = 0o04
-        self.punchflag = 0
-        self.output = ''
+        self.devices = 64 * [None]
+        self.attached = []
+        self.dispatch = 64 * [unknown_device]  # the iot method of each device, by device code
+        self.interrupt_enable = False
+        self.interrupt_delay = False  # ION takes effect after the instruction that follows it
+        self.idle_instructions = 0  # skipped over in wait loops, though counted as executed
+        self.attach(PROCESSOR, Processor())
+        self.tape_reader = Reader()
+        self.tape_punch = Punch()
+        self.attach(self.READER1, self.tape_reader)
+        self.attach(self.PUNCH1, self.tape_punch)
+        for field in range(8):
+            self.attach(0o20 + field, MemoryExtension(field))
         self.tracer = None
+        self.decoded = {}
+        self.translator = BlockTranslator(self)
+        self.instruction_field = 0
+        self.data_field = 0
+        self.instruction_buffer = 0
+        self.save_field = 0
+        self.field_pending = False  # set by CIF until the next JMP or JMS
+        self.select_fields()
         self.ops = [self.andi,
                     self.tad,
                     self.isz,
@@ -58,8 +102,126 @@ class PDP8:
                     self.iot,
                     self.opr]
 
+    # Clears memory and registers so the machine can be reused; decoded
+    # instructions are kept, since they are checked against memory before use.
+    def reset(self):
+        self._memory[:] = array('H', len(self._memory) * [0])
+        self.pc = self.accumulator = self.link = 0
+        self.running = False
+        self.halted = False
+        self.cycles = 0
+        self.ia = self.instruction = None
+        self.interrupt_enable = self.interrupt_delay = False
+        self.idle_instructions = 0
+        for device in self.attached:
+            device.reset()
+        self.instruction_field = self.data_field = self.instruction_buffer = self.save_field = 0
+        self.field_pending = False
+        self.select_fields()
+
+    def attach(self, code, device):
+        self.devices[code] = device
+        self.dispatch[code] = device.iot
+        self.attached = [device for device in dict.fromkeys(self.devices) if device is not None]
+
+    def detach(self, code):
+        self.devices[code] = None
+        self.dispatch[code] = unknown_device
+        self.attached = [device for device in dict.fromkeys(self.devices) if device is not None]
+
+    def interrupt_requested(self):
+        for device in self.attached:
+            if device.interrupt_request(self):
+                return True
+        return False
+
+    # Takes a pending interrupt, if interrupts are on and not held off by ION or a CIF.
+    def check_interrupt(self):
+        if self.interrupt_delay:
+            self.interrupt_delay = False
+        elif not self.field_pending and self.interrupt_requested():
+            self.interrupt()
+
+    # the hardware equivalent of a JMS to location 0 of field 0
+    def interrupt(self):
+        self.interrupt_enable = False
+        self.save_field = (self.instruction_field << 3) | self.data_field
+        self.instruction_field = self.data_field = self.instruction_buffer = 0
+        self.select_fields()
+        self[0] = self.pc
+        self.pc = 1
+        self.cycles += 2
+
+    # how many instructions can run before a device next needs looking at
+    def interrupt_chunk(self, chunk):
+        if self.interrupt_delay:
+            return 1
+        for device in self.attached:
+            event = device.next_event(self)
+            if event is not None:
+                until = max(1, (event - self.cycles) // 3)  # no instruction takes more than 3 cycles
+                chunk = until if chunk is None else min(chunk, until)
+        return chunk
+
+    # Called when the skip IOT at address has not skipped. If it is waiting in a loop
+    # such as TSF; JMP .-1, and its device can say when it will skip, the iterations
+    # before then are skipped over; their instructions and cycles are still counted.
+    # Returns the number of instructions skipped over, which is within budget.
+    def skip_idle_loop(self, address, budget):
+        if address >= 0o7777:
+            return 0
+        jump = self.imem[address + 1]
+        if (jump & 0o7400) != 0o5000 or direct_address(address + 1, jump) != address:
+            return 0
+        ready = self.devices[(self.instruction >> 3) & 0o77].skips_at(self, self.instruction & 0o7)
+        if ready is None:
+            return 0
+        per = instruction_cycles(jump) + instruction_cycles(self.instruction)
+        iterations = min((ready - self.cycles + per - 1) // per - 1, budget // 2)
+        if iterations <= 0:
+            return 0
+        self.cycles += iterations * per
+        self.idle_instructions += 2 * iterations
+        return 2 * iterations
+
+    def snapshot(self):
+        return Snapshot.of(self)
+
+    def restore(self, snapshot):
+        snapshot.restore(self)
+
+    # what the punch has printed, unless it has been given a sink of its own
+    @property
+    def output(self):
+        return self.tape_punch.text()
+
+    @output.setter
+    def output(self, text):
+        self.tape_punch.replace(text)
+
+    @property
+    def memory(self):
+        return self._memory
+
+    # copies into the existing core, so the field views onto it stay valid
+    @memory.setter
+    def memory(self, words):
+        if not isinstance(words, array):
+            words = array('H', (word & self.W_MASK for word in words))
+        if len(words) > len(self._memory):
+            raise ValueError('nonexistent memory at %o' % (len(self._memory)))
+        self._memory[:len(words)] = words
+
+    # copies a run of words into memory in one go, starting at an absolute address
+    def deposit(self, address, words):
+        if address + len(words) > len(self._memory):
+            raise ValueError('nonexistent memory at %o' % (len(self._memory)))
+        if not isinstance(words, array):
+            words = array('H', (word & self.W_MASK for word in words))
+        self._memory[address:address + len(words)] = words
+
     def __getitem__(self, address):
-        return self.memory[address] & self.W_MASK   # only 12 bits retrieved
+        return self._memory[address]
 
     def is_group1(self):
         return 0 == self.i_mask(OPR_GROUP1)
@@ -78,11 +240,16 @@ class PDP8:
         return self.i_mask(HALT)
 
     def __setitem__(self, address, contents):
-        self.memory[address] = contents & self.W_MASK  # only 12 bits stored
+        self._memory[address] = contents & self.W_MASK  # only 12 bits stored
+        offset = address & self.W_MASK
+        self.decoded.pop(offset, None)
+        if offset in self.translator.covered:
+            self.translator.invalidate(offset)
         if self.debugging:
             self.tracer.setting(address, contents)
 
-    def run(self, debugging=False, start=None, tape='', stepping=None, tracer=None):
+    def run(self, debugging=False, start=None, tape='', stepping=None, tracer=None, translate=False,
+            max_instructions=None, timeout=None):
         self.running = True
         if tracer is not None:
                 self.tracer = tracer
@@ -91,26 +258,226 @@ class PDP8:
                 self.tracer = NullTracer()
         if start:
             self.pc = start
-        # TODO: smarter tape creation to cope with text and binary tapes.
-        self.tape = StringIO(tape)
+        if tape is not None:  # None carries on with the current tape
+            self.tape_reader.load(tape)
         if stepping is not None:
             self.stepping = stepping
         self.debugging = debugging
+        self.halted = self.stopped = False
+        cycles = self.cycles
+        deadline = None if timeout is None else monotonic() + timeout
+        if self.debugging or self.stepping:
+            executed = self.run_instrumented(max_instructions, deadline)
+        else:
+            runner = self.run_translated if translate else self.run_fast
+            executed = 0
+            while True:
+                # the budget is enforced by the runner; the deadline is checked between chunks
+                chunk = None if max_instructions is None else max_instructions - executed
+                if deadline is not None:
+                    chunk = CHECK_INTERVAL if chunk is None else min(chunk, CHECK_INTERVAL)
+                if self.interrupt_enable:
+                    chunk = self.interrupt_chunk(chunk)
+                    self.check_interrupt()
+                executed += runner(chunk)
+                if self.halted or self.stopped or executed == max_instructions:
+                    break
+                if deadline is not None and monotonic() >= deadline:
+                    break
+        self.tape_punch.flush()
+        self.tracer.finished()
+        return RunResult(self.run_status(executed, max_instructions), executed, self.cycles - cycles)
+
+    def run_instrumented(self, max_instructions, deadline):
+        executed = 0
         while self.running:
+            if executed == max_instructions:
+                self.running = False
+                break
+            if self.interrupt_enable:
+                self.check_interrupt()
             self.execute()
+            executed += 1
             if self.stepping:
                 self.running = False
+            elif deadline is not None and executed % CHECK_INTERVAL == 0 and monotonic() >= deadline:
+                self.running = False
+        return executed
+
+    def run_status(self, executed, max_instructions):
+        if self.halted:
+            return HALTED
+        if self.stopped:
+            return STOPPED
+        if self.stepping:
+            return STEPPED
+        if executed == max_instructions:
+            return BUDGET_EXHAUSTED
+        return TIMED_OUT
+
+    # Runs without tracing or stepping checks. Registers are held in locals and the
+    # memory reference instructions are inlined; IOT and OPR go through their handlers.
+    def run_fast(self, max_instructions=None):
+        self.running = True
+        imem, dmem = self.imem, self.dmem
+        pending = self.field_pending
+        decoded = self.decoded
+        decode = self.decode
+        group1, skips = GROUP1, SKIPS
+        pc, ac, link = self.pc, self.accumulator, self.link
+        instruction, address = self.instruction, self.ia
+        executed = cycles = skipped = 0
+        for executed in range(1, max_instructions + 1) if max_instructions is not None else count(1):
+            word = imem[pc]
+            entry = decoded.get(pc)
+            if entry is None or entry[0] != word:
+                entry = decode(pc, word)
+            instruction, handler, address, indirect, op, spent = entry
+            cycles += spent
+            if indirect:
+                address = imem[address]
+                memory = dmem
+            else:
+                memory = imem
+            pc += 1
+            if op == 0:    # AND
+                ac &= memory[address]
+            elif op == 1:  # TAD
+                ac += memory[address]
+                if ac > 0o7777:
+                    ac &= 0o7777
+                    link = 1
+                else:
+                    link = 0
+            elif op == 2:  # ISZ
+                contents = (memory[address] + 1) & 0o7777
+                memory[address] = contents
+                if contents == 0:
+                    pc += 1
+            elif op == 3:  # DCA
+                memory[address] = ac
+                ac = 0
+            elif op == 4:  # JMS
+                if pending:
+                    self.transfer_field()
+                    imem, dmem, pending = self.imem, self.dmem, False
+                    if self.interrupt_enable:
+                        imem[address] = pc & 0o7777
+                        pc = address + 1
+                        break  # run() takes the interrupt that the CIF held off
+                imem[address] = pc & 0o7777
+                pc = address + 1
+            elif op == 5:  # JMP
+                if pending:
+                    self.transfer_field()
+                    imem, dmem, pending = self.imem, self.dmem, False
+                    if self.interrupt_enable:
+                        pc = address
+                        break  # run() takes the interrupt that the CIF held off
+                pc = address
+            elif op == 7 and not instruction & 0o0400:  # group 1 OPR
+                ac, link = group1[instruction & 0o0377](ac, link)
+            elif op == 7 and not instruction & 0o0003:  # group 2 OPR, other than HLT
+                if skips[(instruction >> 3) & 0o17] >> (((ac >> 9) & 4) | (2 if ac == 0 else 0) | link) & 1:
+                    pc += 1
+                if instruction & 0o0200:
+                    ac = 0
+            else:
+                self.pc, self.accumulator, self.link = pc, ac, link
+                self.instruction, self.ia = instruction, address
+                self.cycles += cycles  # devices may look at the time
+                cycles = 0
+                handler()
+                if op == 6:
+                    imem, dmem, pending = self.imem, self.dmem, self.field_pending
+                    if self.interrupt_enable:
+                        pc, ac, link = self.pc, self.accumulator, self.link
+                        break  # the IOT may have turned interrupts on or raised a request
+                    if self.pc == pc:
+                        budget = max_instructions - executed if max_instructions is not None else MAX_RUN
+                        skipped = self.skip_idle_loop(pc - 1, budget)
+                        if skipped:
+                            break  # run() carries on with what is left of the budget
+                pc, ac, link = self.pc, self.accumulator, self.link
+                if not self.running:
+                    break
+        else:
+            self.running = False
+        self.pc, self.accumulator, self.link = pc, ac, link
+        self.instruction, self.ia = instruction, address
+        self.cycles += cycles
+        return executed + skipped
+
+    # Runs straight-line code as blocks compiled by the BlockTranslator, falling back
+    # to execute() for instructions that end a block, such as IOTs and HLT.
+    def run_translated(self, max_instructions=None):
+        self.running = True
+        translator = self.translator
+        translator.revalidate(self.imem)
+        blocks = translator.blocks
+        limit = MAX_RUN if max_instructions is None else max_instructions
+        imem, dmem, pending = self.imem, self.dmem, self.field_pending  # only changed by execute()
+        executed = 0
+        while executed < limit:
+            pc = self.pc
+            block = blocks.get(pc) or translator.translate(pc)
+            if block.function is None or block.length > limit - executed or pending:
+                self.execute()
+                executed += 1
+                imem, dmem = self.imem, self.dmem
+                if self.instruction >> 9 == 6:
+                    if self.interrupt_enable:
+                        break
+                    if self.pc == pc + 1:
+                        executed += self.skip_idle_loop(pc, limit - executed)
+                elif pending and not self.field_pending and self.interrupt_enable:
+                    break  # a JMP or JMS ended a field transfer; run() takes the interrupt it held off
+                pending = self.field_pending
+                if not self.running:
+                    break
+            else:
+                executed += block.function(self, imem, dmem, limit - executed)
+                if not self.running:
+                    break  # the block ended with a HLT
+        else:
+            self.running = False
+        translator.remember(imem)
+        return executed
 
     def execute(self):
         old_pc = self.pc  # for debugging
-        self.instruction = self[self.pc]
-        self.ia = self.instruction_address()
-        op = self.opcode()
-        self.pc += 1
-        self.ops[op]()
+        word = self.imem[old_pc]
+        decoded = self.decoded.get(old_pc)
+        # the cached entry is only valid while the word at old_pc is unchanged
+        if decoded is None or decoded[0] != word:
+            decoded = self.decode(old_pc, word)
+        self.instruction, handler, address, indirect, op, cycles = decoded
+        self.cycles += cycles
+        self.ia = self.dbase + self.imem[address] if indirect else self.ibase + address
+        self.pc = old_pc + 1
+        handler()
         if self.debugging:
             self.tracer.instruction(old_pc, self.instruction, self.accumulator, self.link, self.pc)
 
+    def decode(self, address, instruction):
+        op = instruction >> self.W_BITS - self.OP_BITS
+        direct = instruction & self.V_MASK
+        if not instruction & Z_BIT:
+            direct += address & 0o7600
+        indirect = instruction & I_BIT
+        cycles = CYCLES[op] + (1 if indirect and op < 6 else 0)
+        decoded = (instruction, self.handler(op, instruction), direct, indirect, op, cycles)
+        self.decoded[address] = decoded
+        return decoded
+
+    def handler(self, op, instruction):
+        if op == 7:  # resolve the OPR group once, rather than on every execution
+            if not instruction & OPR_GROUP1:
+                return self.group1
+            if not instruction & OPR_GROUP2:
+                return self.group2
+        return self.ops[op]
+
     def opcode(self):
         bits = self.i_mask(self.OP_MASK)
         code = bits >> self.W_BITS - self.OP_BITS
@@ -132,10 +499,9 @@ class PDP8:
             self.link = 1
 
     def isz(self):
-        contents = self[self.ia]
-        contents += 1
+        contents = self[self.ia] + 1
         self[self.ia] = contents  # forces 12-bit value
-        if self[self.ia] == 0:
+        if contents & self.W_MASK == 0:
             self.pc += 1  # skip
 
     def dca(self):
@@ -143,21 +509,36 @@ class PDP8:
         self.accumulator = 0
 
     def jmp(self):
-        self.pc = self.ia
+        if self.field_pending:
+            self.transfer_field()
+        self.pc = self.ia & self.W_MASK
 
     def jms(self):
-        self[self.ia] = self.pc
-        self.pc = self.ia + 1
+        if self.field_pending:
+            self.transfer_field()
+        target = self.ia & self.W_MASK
+        self[self.ibase + target] = self.pc
+        self.pc = target + 1
+
+    def transfer_field(self):
+        self.instruction_field = self.instruction_buffer
+        self.field_pending = False
+        self.select_fields()
+
+    # Field views are resolved here, when a field changes, rather than on every access.
+    def select_fields(self):
+        self.ibase = self.instruction_field << self.W_BITS
+        self.dbase = self.data_field << self.W_BITS
+        if self.fields == 1:
+            self.imem = self.dmem = self._memory
+        else:
+            core = memoryview(self._memory)
+            self.imem = core[self.ibase:self.ibase + 2 ** self.W_BITS]
+            self.dmem = core[self.dbase:self.dbase + 2 ** self.W_BITS]
+        self.translator.select_field(self.instruction_field)
 
     def iot(self):
-        device = (self.instruction & 0o0770) >> 3
-        io_op = self.instruction & 0o0007
-        if device == self.READER1:
-            self.reader(io_op)
-        elif device == self.PUNCH1:
-            self.punch(io_op)
-        else:
-            raise ValueError('uknown device')
+        self.dispatch[(self.instruction & 0o0770) >> 3](self, self.instruction & 0o0007)
 
     def opr(self):
         if self.is_group1():
@@ -168,118 +549,27 @@ class PDP8:
             return
         raise ValueError('Unknown opcode in instruction 0o%o at %d(%o)' % (self.instruction, self.pc-1, self.pc-1) )
 
-    def instruction_address(self):
-        o = self.i_mask(self.V_MASK)
-        if not self.i_mask(Z_BIT):
-            o += self.pc & 0o7600
-        if self.i_mask(I_BIT):
-            o = self[o]
-        return o
-
     def cla(self):
         self.accumulator = 0
 
-    def cll(self):
-        self.link = 0
-
-    def cma(self):
-        self.accumulator ^= 0o7777
-
-    def cml(self):
-        self.link = 1-self.link
-
-    def rr(self):
-        self.rar(0 < self.i_mask(2))
-
-    def rar(self, flag):
-        count = 2 if flag else 1
-        for i in range(count):
-            new_link = self.accumulator & 0o0001
-            self.accumulator = self.accumulator >> 1
-            if self.link:
-                self.accumulator |= 0o4000
-            self.link = new_link
-
-    def rl(self):
-        self.ral(self.i_mask(2))
-
-    def ral(self, flag):
-        count = 2 if flag else 1
-        for i in range(count):
-            new_link = 1 if self.accumulator & 0o4000 else 0
-            self.accumulator = 0o7777 & self.accumulator << 1
-            if self.link:
-                self.accumulator |= 0o0001
-            self.link = new_link
-
-    def iac(self):
-        self.add_12_bits(1)
-
     def halt(self):
         if self.debugging:
             print('Halted')
         self.tracer.halt(self.pc)
         self.running = False
+        self.halted = True
 
     def group1(self):
-        for (mask, ins) in zip([     CLA1,     CLL,      CMA,      CML,      IAC,     RAR,     RAL],
-                               [self.cla, self.cll, self.cma, self.cml, self.iac,self.rr, self.rl]):
-            if self.i_mask(mask):
-                ins()
-
-    def is_or_group(self):
-        return not self.i_mask(BIT8)
-
-    def is_and_group(self):
-        return self.i_mask(BIT8)
+        self.accumulator, self.link = GROUP1[self.instruction & 0o377](self.accumulator, self.link)
 
     def group2(self):
-        if self.is_or_group() and (self.sma() or self.sza() or self.snl()):
-            self.pc += 1
-        if self.is_and_group() and self.spa() and self.sna() and self.szl():
+        if SKIPS[(self.instruction >> 3) & 0o17] >> skip_state(self.accumulator, self.link) & 1:
             self.pc += 1
         if self.is_cla2():
             self.cla()
         if self.is_halt():
             self.halt()
 
-    def sma(self):
-        return self.accumulator_is_negative() and (self.i_mask(octal('0100')))
-
-    def accumulator_is_negative(self):
-        return self.accumulator & octal('4000')
-
-    def sza(self):
-        return self.accumulator == 0 and (self.i_mask(octal('0040')))
-
-    def snl(self):
-        return self.link == 1 and (self.i_mask(octal('0020')))
-
-    def spa(self):
-        return self.accumulator_is_positive() or not (self.i_mask(octal('0100')))
-
-    def accumulator_is_positive(self):
-        return not self.accumulator_is_negative()
-
-    def sna(self):
-        return self.accumulator != 0 or not (self.i_mask(octal('0040')))
-
-    def szl(self):
-        return self.link == 0 or not (self.i_mask(octal('0020')))
-
-    def reader(self, io_op):
-        pass
-
-    def punch(self, io_op):
-        if (io_op & 1) and self.punchflag:
-            self.pc += 1
-        if io_op & 2:
-            self.punchflag = 0
-        if io_op & 4:
-            if self.accumulator != 0:
-                self.output += str(chr(self.accumulator))
-            self.punchflag = 1
-
     def is_cla2(self):
         return self.instruction & octal('0200')
 
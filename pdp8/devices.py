@@ -0,0 +1,359 @@
+import mmap
+import struct
+from abc import ABCMeta, abstractmethod
+
+CHUNK_SIZE = 1 << 16
+FLUSH_THRESHOLD = 1 << 12
+PROCESSOR = 0o00
+CLOCK = 0o13
+
+
+# A device is attached to a PDP8 at one or more of the 64 device codes. An IOT
+# instruction 6xxy calls iot on the device attached at code xx, with the
+# operation y; the device reads and changes the PDP8's registers directly,
+# and skips by incrementing pdp8.pc. reset is called when the PDP8 is reset.
+# While interrupts are on, the PDP8 asks each device whether it is requesting
+# an interrupt after every IOT, and again when the cycle count reaches the
+# next event of any device whose state changes by itself, such as a clock.
+# skips_at lets the PDP8 fast-forward through wait loops such as TSF; JMP .-1.
+# state and restore save and restore any state of the device's own, as bytes,
+# for snapshots.
+class Device(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def iot(self, pdp8, io_op):
+        pass
+
+    def reset(self):
+        pass
+
+    def interrupt_request(self, pdp8):
+        return False
+
+    # the cycle count at which the device will next raise a request by itself, or None
+    def next_event(self, pdp8):
+        return None
+
+    # Called after a skip IOT has not skipped. Returns the cycle count from which
+    # the same IOT would skip, provided the IOT changes nothing until then, or None.
+    def skips_at(self, pdp8, io_op):
+        return None
+
+    def state(self):
+        return b''
+
+    def restore(self, state):
+        pass
+
+
+# A device that raises its flag when it finishes an operation, which takes
+# latency cycles, or happens at once if the latency is 0.
+class FlagDevice(Device):
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.flag = 0
+        self.ready_at = None
+
+    def start(self, pdp8):
+        self.flag = 0
+        if self.latency:
+            self.ready_at = pdp8.cycles + self.latency
+        else:
+            self.finish()
+
+    def finish(self):
+        self.flag = 1
+
+    def update(self, pdp8):
+        if self.ready_at is not None and pdp8.cycles >= self.ready_at:
+            self.ready_at = None
+            self.finish()
+
+    def interrupt_request(self, pdp8):
+        self.update(pdp8)
+        return self.flag
+
+    def next_event(self, pdp8):
+        return self.ready_at
+
+    def skips_at(self, pdp8, io_op):
+        if io_op == 1 and not self.flag:
+            return self.ready_at
+        return None
+
+
+def unknown_device(pdp8, io_op):
+    raise ValueError('uknown device')
+
+
+# The tape reader behind KSF, KCC, KRS and KRB. The tape is held as bytes,
+# which may be an mmap, or read from a binary file a chunk at a time, so each
+# character costs an index into the current chunk rather than a call.
+# Characters are loaded into the buffer when the reader has advanced, setting
+# the flag; once the tape runs out the flag stays clear.
+class Reader(FlagDevice):
+    def __init__(self, tape=b'', chunk_size=CHUNK_SIZE, latency=0):
+        FlagDevice.__init__(self, latency)
+        self.chunk_size = chunk_size
+        self.load(tape)
+
+    # tape may be text, a bytes-like object or a binary file
+    def load(self, tape):
+        if isinstance(tape, str):
+            tape = tape.encode('latin-1')
+        if hasattr(tape, 'read') and not isinstance(tape, mmap.mmap):
+            self.file = tape
+            self.chunk = b''
+            self.origin = tape.tell() if tape.seekable() else 0  # where the tape starts in the file
+        else:
+            self.file = None
+            self.chunk = tape
+            self.origin = 0
+        self.chunk_start = 0  # where the chunk starts on the tape
+        self.position = 0
+        self.buffer = 0
+        self.flag = 0
+        self.ready_at = None
+        self.advance()
+
+    def reset(self):
+        self.load(b'')
+
+    # carries on from a saved state, reading the tape from position
+    def resume(self, tape, position, buffer, flag):
+        self.file = None
+        self.chunk = tape
+        self.origin = self.chunk_start = 0
+        self.position = position
+        self.buffer = buffer
+        self.flag = flag
+
+    # Where the characters not yet loaded into the buffer can be read again without
+    # disturbing the reader: the tape, as bytes or the name of a file, and the
+    # position of the next character in it.
+    def source(self):
+        position = self.chunk_start + self.position
+        if self.file is None:
+            return self.chunk, position
+        if hasattr(self.file, 'getvalue'):
+            return self.file.getvalue(), self.origin + position  # BytesIO shares its bytes rather than copying
+        name = getattr(self.file, 'name', None)
+        if isinstance(name, str) and self.file.seekable():
+            return name, self.origin + position
+        raise ValueError('the tape cannot be read again, so the reader cannot be saved')
+
+    def finish(self):
+        self.advance()
+
+    def advance(self):
+        if self.position >= len(self.chunk) and self.file is not None:
+            self.chunk_start += len(self.chunk)
+            self.chunk = self.file.read(self.chunk_size)
+            self.position = 0
+        if self.position < len(self.chunk):
+            self.buffer = self.chunk[self.position]
+            self.position += 1
+            self.flag = 1
+
+    def iot(self, pdp8, io_op):
+        if self.ready_at is not None:
+            self.update(pdp8)
+        if (io_op & 1) and self.flag:  # KSF
+            pdp8.pc += 1
+        if io_op & 2:  # KCC
+            pdp8.accumulator = 0
+        if io_op & 4:  # KRS
+            pdp8.accumulator |= self.buffer
+        if io_op & 2:
+            self.start(pdp8)
+
+
+# The tape punch behind TSF, TCF, TPC and TLS. Punched characters collect in a
+# bytearray and are passed on a block at a time once the flush threshold is
+# reached. The sink can be a binary file or anything else with a write method,
+# such as a BytesIO, a bytearray, or a function taking each block; without one
+# the blocks are kept in memory and can be read back as text.
+class Punch(FlagDevice):
+    def __init__(self, sink=None, threshold=FLUSH_THRESHOLD, latency=0):
+        FlagDevice.__init__(self, latency)
+        self.connect(sink, threshold)
+
+    def connect(self, sink=None, threshold=FLUSH_THRESHOLD):
+        self.sink = sink
+        self.threshold = threshold
+        self.pending = bytearray()
+        self.punched = []
+        self.flag = 0
+        self.ready_at = None
+        if sink is None:
+            self.write = self.punched.append
+        elif isinstance(sink, bytearray):
+            self.write = sink.extend
+        elif hasattr(sink, 'write'):
+            self.write = sink.write
+        else:
+            self.write = sink
+
+    def flush(self):
+        if self.pending:
+            self.write(bytes(self.pending))
+            self.pending.clear()
+
+    # the text punched so far, if there is no sink
+    def text(self):
+        self.flush()
+        if len(self.punched) > 1:
+            self.punched[:] = [b''.join(self.punched)]
+        return self.punched[0].decode('latin-1') if self.punched else ''
+
+    # the number of characters punched so far, if there is no sink
+    def length(self):
+        return len(self.pending) + sum(len(block) for block in self.punched)
+
+    def reset(self):
+        self.replace('')
+        self.flag = 0
+        self.ready_at = None
+
+    def replace(self, text):
+        self.pending.clear()
+        self.punched[:] = [text.encode('latin-1')] if text else []
+
+    def iot(self, pdp8, io_op):
+        if self.ready_at is not None:
+            self.update(pdp8)
+        if (io_op & 1) and self.flag:  # TSF
+            pdp8.pc += 1
+        if io_op & 2:  # TCF
+            self.flag = 0
+        if io_op & 4:  # TPC
+            if pdp8.accumulator != 0:
+                self.pending.append(pdp8.accumulator & 0o377)
+                if len(self.pending) >= self.threshold:
+                    self.flush()
+            self.start(pdp8)
+
+
+# The KM8-E memory extension; one is attached at each of the codes 20 to 27,
+# for the field that the code selects.
+class MemoryExtension(Device):
+    def __init__(self, field):
+        self.field = field
+
+    def iot(self, pdp8, io_op):
+        field = self.field
+        if io_op & 3:
+            if field >= pdp8.fields:
+                raise ValueError('nonexistent memory field %d' % field)
+            if io_op & 1:  # CDF
+                pdp8.data_field = field
+            if io_op & 2:  # CIF
+                pdp8.instruction_buffer = field
+                pdp8.field_pending = True
+            pdp8.select_fields()
+        elif io_op == 4:
+            if field == 1:    # RDF
+                pdp8.accumulator |= pdp8.data_field << 3
+            elif field == 2:  # RIF
+                pdp8.accumulator |= pdp8.instruction_field << 3
+            elif field == 3:  # RIB
+                pdp8.accumulator |= pdp8.save_field
+            elif field == 4:  # RMF
+                pdp8.instruction_buffer = (pdp8.save_field >> 3) & 0o7
+                pdp8.data_field = pdp8.save_field & 0o7
+                pdp8.field_pending = True
+                pdp8.select_fields()
+
+
+# The interrupt system, at device code 00.
+class Processor(Device):
+    def iot(self, pdp8, io_op):
+        if io_op == 0:  # SKON
+            if pdp8.interrupt_enable:
+                pdp8.pc += 1
+            pdp8.interrupt_enable = False
+        elif io_op == 1:  # ION, from after the next instruction
+            pdp8.interrupt_enable = pdp8.interrupt_delay = True
+        elif io_op == 2:  # IOF
+            pdp8.interrupt_enable = False
+        elif io_op == 3:  # SRQ
+            if pdp8.interrupt_requested():
+                pdp8.pc += 1
+        elif io_op == 4:  # GTF
+            pdp8.accumulator = ((pdp8.link << 11) |
+                                (0o1000 if pdp8.interrupt_requested() else 0) |
+                                (0o0400 if pdp8.field_pending else 0) |
+                                (0o0200 if pdp8.interrupt_enable else 0) |
+                                pdp8.save_field)
+        elif io_op == 5:  # RTF
+            if (pdp8.accumulator >> 3) & 0o7 >= pdp8.fields or pdp8.accumulator & 0o7 >= pdp8.fields:
+                raise ValueError('nonexistent memory field in 0o%o' % pdp8.accumulator)
+            pdp8.link = pdp8.accumulator >> 11
+            pdp8.instruction_buffer = (pdp8.accumulator >> 3) & 0o7
+            pdp8.data_field = pdp8.accumulator & 0o7
+            pdp8.field_pending = True
+            pdp8.select_fields()
+            pdp8.interrupt_enable = pdp8.interrupt_delay = True
+        elif io_op == 7:  # CAF
+            pdp8.accumulator = pdp8.link = 0
+            pdp8.interrupt_enable = pdp8.interrupt_delay = False
+        # SGT (6) never skips, as there is no greater-than flag
+
+
+# A real-time clock in the style of the KW8, at device code 13. It ticks every
+# period cycles of emulated time, setting its flag; CLEI and CLDI turn its
+# interrupt on and off, and CLSK skips if the flag is set, clearing it.
+class Clock(Device):
+    STATE = struct.Struct('<qBB')  # ticks (-1 before the first update), flag, enabled
+
+    def __init__(self, period):
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.ticks = None
+        self.flag = 0
+        self.enabled = False
+
+    def update(self, pdp8):
+        ticks = pdp8.cycles // self.period
+        if self.ticks is None:
+            self.ticks = ticks
+        elif ticks > self.ticks:
+            self.ticks = ticks
+            self.flag = 1
+
+    def interrupt_request(self, pdp8):
+        self.update(pdp8)
+        return self.flag and self.enabled
+
+    def next_event(self, pdp8):
+        if not self.enabled:
+            return None
+        self.update(pdp8)
+        return (self.ticks + 1) * self.period
+
+    def skips_at(self, pdp8, io_op):
+        if io_op == 3 and not self.flag:  # CLSK changes nothing until the clock ticks
+            return (self.ticks + 1) * self.period
+        return None
+
+    def state(self):
+        return self.STATE.pack(-1 if self.ticks is None else self.ticks, self.flag, self.enabled)
+
+    def restore(self, state):
+        (ticks, self.flag, enabled) = self.STATE.unpack(state)
+        self.ticks = None if ticks < 0 else ticks
+        self.enabled = bool(enabled)
+
+    def iot(self, pdp8, io_op):
+        self.update(pdp8)
+        if io_op == 1:  # CLEI
+            self.enabled = True
+        elif io_op == 2:  # CLDI
+            self.enabled = False
+        elif io_op == 3:  # CLSK
+            if self.flag:
+                pdp8.pc += 1
+            self.flag = 0
@@ -0,0 +1,177 @@
+from pdp8.pal import InstructionPlanter, mri_values, g1values, g2values, iotvalues, fieldvalues, statements
+from pdp8.tracing import PrintingTracer
+
+IOT_GROUPS = [frozenset(['KSF', 'KCC', 'KRS', 'KRB']),
+              frozenset(['TSF', 'TCF', 'TPC', 'TLS']),
+              frozenset(['RDF', 'RIF', 'RIB', 'RMF'])]
+# the processor and clock IOTs stand alone
+IOT_GROUPS += [frozenset([mnemonic]) for mnemonic in
+               ['SKON', 'ION', 'IOF', 'SRQ', 'GTF', 'RTF', 'SGT', 'CAF', 'CLEI', 'CLDI', 'CLSK']]
+
+
+def is_ascii(text):
+    return all(ord(c) < 128 for c in text)
+
+
+def is_identifier(text):
+    return text[:1].isupper() and text.isalnum() and is_ascii(text)
+
+
+def is_number(text):
+    return text.isdigit() and is_ascii(text)
+
+
+class Unresolved(Exception):
+    def __init__(self, symbol):
+        Exception.__init__(self, symbol)
+        self.symbol = symbol
+
+
+# A single-pass alternative to Pal. Each line is split into tokens once and
+# classified by its first mnemonic with a dictionary lookup. Operands that
+# refer to symbols not yet defined are recorded and patched once the whole
+# source has been read. The code it plants is the same as Pal's.
+class FastPal():
+    # cache, if given, is an ImageCache consulted before assembling
+    def __init__(self, pdp8, cache=None):
+        self.pdp8 = pdp8
+        self.cache = cache
+        self.planter = InstructionPlanter()
+        self.base = 8
+        self.fixups = []
+        self.builders = {}
+        for mnemonic in mri_values:
+            self.builders[mnemonic] = self.mri
+        for mnemonic in list(g1values) + list(g2values):
+            self.builders[mnemonic] = self.opr
+        for mnemonic in iotvalues:
+            self.builders[mnemonic] = self.iot
+        for mnemonic in fieldvalues:
+            self.builders[mnemonic] = self.field
+
+    def instruction(self, string, location):
+        self.planter.reset()
+        self.planter.ic = location
+        self.fixups = []
+        self.assemble_line(string)
+        self.resolve()
+        return self.planter.code[location]
+
+    def assemble(self, lines, list_symbols=False):
+        self.planter.reset()
+        self.fixups = []
+        source = list(statements(lines)) if self.cache else statements(lines)
+        key = self.cache.key('FastPal', source) if self.cache else None
+        if key is None or not self.cache.load(key, self.planter):
+            for line in source:
+                self.assemble_line(line)
+            self.resolve()
+            if key is not None:
+                self.cache.store(key, self.planter)
+        if list_symbols:
+            symbols = self.planter.symbols
+            for key in symbols:
+                print('%8s = %4d (%4o)' % (key, symbols[key], symbols[key]))
+        self.pdp8.memory = self.planter.code
+        self.pdp8.tracer = PrintingTracer(self.planter.source)
+
+    def assemble_line(self, line):
+        if line.startswith('*') and is_number(line[1:]):
+            self.planter.org(int(line[1:], self.base))
+            return
+        body = line
+        head, comma, rest = line.partition(',')
+        if comma and is_identifier(head) and rest[:1].isspace() and rest.strip():
+            self.planter.define(head)
+            body = rest.strip()
+        tokens = body.split()
+        builder = self.builders.get(tokens[0], self.expression)
+        self.plant(builder, tokens, line)
+
+    def plant(self, builder, tokens, line):
+        ic = self.planter.ic
+        try:
+            instruction = builder(tokens, line, ic)
+        except Unresolved:
+            self.fixups.append((ic, builder, tokens, line))
+            instruction = 0
+        self.planter.plant(instruction, line)
+
+    def resolve(self):
+        for (ic, builder, tokens, line) in self.fixups:
+            try:
+                self.planter.code[ic] = builder(tokens, line, ic) & 0o7777
+            except Unresolved as e:
+                raise KeyError(e.symbol)
+        self.fixups = []
+
+    def unrecognised(self, line):
+        return ValueError('I cannot recognise line %s' % line)
+
+    def evaluate(self, text, line, ic):
+        split = max(text.find('+', 1), text.find('-', 1))
+        if split < 0:
+            return self.term(text.strip(), line, ic, True)
+        v1 = self.term(text[:split].strip(), line, ic, True)
+        v2 = self.term(text[split + 1:].strip(), line, ic, False)
+        return v1 + v2 if text[split] == '+' else v1 - v2
+
+    def term(self, text, line, ic, first):
+        if is_number(text):
+            return int(text, self.base)
+        if first and text == '.':
+            return ic
+        if is_identifier(text):
+            if text not in self.planter.symbols:
+                raise Unresolved(text)
+            return self.planter.symbols[text]
+        raise self.unrecognised(line)
+
+    def expression(self, tokens, line, ic):
+        return self.evaluate(' '.join(tokens), line, ic)
+
+    def mri(self, tokens, line, ic):
+        op = mri_values[tokens[0]]
+        operands = tokens[1:]
+        if len(operands) > 1 and operands[0] == 'I':
+            op |= 0o0400
+            operands = operands[1:]
+        if len(operands) > 1 and operands[0] == 'Z':
+            op |= 0o0200
+            operands = operands[1:]
+        if not operands:
+            raise self.unrecognised(line)
+        offset = self.evaluate(' '.join(operands), line, ic)
+        if offset < 0o0200:
+            op |= 0o0200  # force PAGE 0
+        else:
+            if offset & 0o7600 != ic & 0o7600:
+                raise Exception('%s offset refers to an inaccessible page' % line)
+            offset &= 0o0177
+        return op | offset
+
+    def opr(self, tokens, line, ic):
+        for values in (g1values, g2values):
+            if all(token in values for token in tokens):
+                op = 0
+                for token in tokens:
+                    op |= values[token]
+                return op
+        raise self.unrecognised(line)
+
+    def iot(self, tokens, line, ic):
+        for group in IOT_GROUPS:
+            if all(token in group for token in tokens):
+                op = 0
+                for token in tokens:
+                    op |= iotvalues[token]
+                return op
+        raise self.unrecognised(line)
+
+    def field(self, tokens, line, ic):
+        if len(tokens) < 2 or not is_number(tokens[-1]) or not all(token in fieldvalues for token in tokens[:-1]):
+            raise self.unrecognised(line)
+        op = int(tokens[-1], self.base) & 0o0070
+        for token in tokens[:-1]:
+            op |= fieldvalues[token]
+        return op
@@ -0,0 +1,93 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from pdp8.pal import mri_values, g1values, g2values, iotvalues, fieldvalues
+
+MAGIC = b'P8IM'
+VERSION = 1
+ASSEMBLERS = 1  # raise this whenever Pal or FastPal changes the code it plants
+WORDS = 4096
+
+# the mnemonic tables are part of every key, so changing them misses old entries
+TABLES = repr([sorted(table.items()) for table in (mri_values, g1values, g2values, iotvalues, fieldvalues)])
+
+# magic, version, length of the symbol table, length of the source map
+HEADER = struct.Struct('<4sBII')
+
+
+# An on-disk cache of assembled images, keyed by a hash of the assembler's
+# version and the statements it was given. Each entry holds the code as raw
+# little-endian words followed by the symbol table and the source map as text,
+# and is mapped back into memory rather than read.
+class ImageCache(object):
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, assembler, statements):
+        digest = hashlib.sha256(('%s\n%d\n%d\n%s\n' % (assembler, VERSION, ASSEMBLERS, TABLES)).encode('utf-8'))
+        for line in statements:
+            digest.update(line.encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + '.img')
+
+    # fills the planter from the cache; returns False if there is no usable entry for the key
+    def load(self, key, planter):
+        try:
+            with open(self.filename(key), 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+        try:
+            with data:
+                code, symbols, source = self.read(data)
+        except (struct.error, ValueError):
+            return False  # a truncated or corrupt entry is treated as a miss
+        if code is None:
+            return False
+        planter.code = code
+        planter.symbols = symbols
+        planter.source = source
+        return True
+
+    def read(self, data):
+        magic, version, symbols_length, source_length = HEADER.unpack_from(data)
+        start = HEADER.size + 2 * WORDS
+        if magic != MAGIC or version != VERSION or len(data) != start + symbols_length + source_length:
+            return None, None, None
+        code = array('H')
+        code.frombytes(data[HEADER.size:start])
+        if sys.byteorder == 'big':
+            code.byteswap()
+        symbols = {}
+        for entry in data[start:start + symbols_length].decode('utf-8').splitlines():
+            symbol, value = entry.split(' ')
+            symbols[symbol] = int(value)
+        start += symbols_length
+        source = {}
+        for entry in data[start:start + source_length].decode('utf-8').splitlines():
+            address, line = entry.split(' ', 1)
+            source[int(address)] = line
+        return code, symbols, source
+
+    def store(self, key, planter):
+        code = array('H', planter.code)
+        if sys.byteorder == 'big':
+            code.byteswap()
+        symbols = ''.join('%s %d\n' % item for item in planter.symbols.items()).encode('utf-8')
+        source = ''.join('%d %s\n' % item for item in planter.source.items()).encode('utf-8')
+        filename = self.filename(key)
+        temporary = '%s.%d' % (filename, os.getpid())
+        with open(temporary, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(symbols), len(source)))
+            f.write(code.tobytes())
+            f.write(symbols)
+            f.write(source)
+        os.replace(temporary, filename)  # readers never see a partly written entry
@@ -0,0 +1,40 @@
+from pdp8.translator import group1_source, group2_skip_condition
+
+
+# Group 1 operate instructions, indexed by their low eight bits. Each entry is a
+# function taking and returning (ac, link) that applies all of the instruction's
+# micro-operations at once. The 256 functions are compiled the first time each
+# combination is used.
+class Group1Table(dict):
+    def __missing__(self, bits):
+        lines = ['def transform(ac, link):'] + ['    ' + line for line in group1_source(bits)] + ['    return ac, link']
+        namespace = {}
+        exec(compile('\n'.join(lines), '<group 1 0o%03o>' % bits, 'exec'), namespace)
+        transform = namespace['transform']
+        self[bits] = transform
+        return transform
+
+
+GROUP1 = Group1Table()
+
+# representative (ac, link) values for each skip state
+STATES = [(0o4000 if state & 4 else 0 if state & 2 else 1, state & 1) for state in range(8)]
+
+
+def skip_state(ac, link):
+    return ((ac >> 9) & 4) | (2 if ac == 0 else 0) | link
+
+
+def skip_mask(bits):
+    condition = group2_skip_condition(bits << 3)
+    mask = 0
+    if condition is not None:
+        for (state, (ac, link)) in enumerate(STATES):
+            if eval(condition, {'ac': ac, 'link': link}):
+                mask |= 1 << state
+    return mask
+
+
+# Group 2 skips, indexed by bits 3 to 6 of the instruction (SMA, SZA, SNL and the
+# reverse-sense bit); bit n of each entry says whether to skip in skip state n.
+SKIPS = [skip_mask(bits) for bits in range(16)]
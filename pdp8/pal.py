@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABCMeta
+from array import array
 from io import StringIO
 from operator import add, sub
 
@@ -27,7 +28,11 @@ opr = name(one_of(g1, g2),'opr')
 org = escape('*') + name(digits,'org')
 iot_reader = multiple(osp+one_of('KSF','KCC','KRS','KRB'))
 iot_punch = multiple(osp+one_of('TSF','TCF','TPC','TLS'))
-iot = name(one_of(iot_reader, iot_punch),'iot')
+iot_memory = multiple(osp+one_of('RDF','RIF','RIB','RMF'))
+iot_processor = osp+one_of('SKON','ION','IOF','SRQ','GTF','RTF','SGT','CAF')
+iot_clock = osp+one_of('CLEI','CLDI','CLSK')
+iot = name(one_of(iot_reader, iot_punch, iot_memory, iot_processor, iot_clock),'iot')
+field = name(multiple(osp+one_of('CDF','CIF')),'fieldop') + spaces + name(digits,'field')
 
 
 mri_values = {
@@ -82,6 +87,27 @@ iotvalues = {
 'TCF':      0o6042,
 'TPC':      0o6044,
 'TLS':      0o6046,
+'RDF':      0o6214,
+'RIF':      0o6224,
+'RIB':      0o6234,
+'RMF':      0o6244,
+'SKON':     0o6000,
+'ION':      0o6001,
+'IOF':      0o6002,
+'SRQ':      0o6003,
+'GTF':      0o6004,
+'RTF':      0o6005,
+'SGT':      0o6006,
+'CAF':      0o6007,
+'CLEI':     0o6131,
+'CLDI':     0o6132,
+'CLSK':     0o6133,
+}
+
+fieldvalues = {
+# Mnemonic  Octal   Operation
+'CDF':      0o6201, # Change data field to N (operand is 10 * N)
+'CIF':      0o6202, # Change instruction field to N at the next JMP or JMS
 }
 
 
@@ -95,12 +121,8 @@ class Parser:
         self.base = 8
 
     def parse(self, input):
-        for line in input:
-            line = self.decommented_and_trimmed(line)
-            if '$' in line: # end of pal file
-                break
-            if len(line) > 0:
-                self.parse_line(line)
+        for line in statements(input):
+            self.parse_line(line)
 
     def match(self, statement, line):
         return match_line(statement, line)
@@ -121,6 +143,21 @@ class Parser:
             raise(ValueError('I cannot recognise line %s' % line))
         self.successor.parse_line(line)
 
+    # the parser in the chain that matches the line, and what it matched
+    def recognise(self, line):
+        statement = self.match(self.syntax, line)
+        if statement is not None:
+            return self, statement
+        if self.successor is None:
+            raise(ValueError('I cannot recognise line %s' % line))
+        return self.successor.recognise(line)
+
+    # the first pass: defines the statement's label and leaves room for its word
+    def allocate(self, parsed):
+        if 'label' in parsed:
+            self.planter.define(parsed['label'])
+        self.planter.ic += 1
+
     @abstractmethod
     def build_instruction(self, parsed):
         pass
@@ -149,18 +186,28 @@ class Parser:
         return int(parsed[v], self.base)
 
 
+# yields the non-empty lines of PAL source, without comments, up to the end mark
+def statements(lines):
+    for line in lines:
+        line = Parser.decommented_and_trimmed(line)
+        if '$' in line: # end of pal file
+            break
+        if len(line) > 0:
+            yield line
+
+
 class InstructionPlanter():
     def __init__(self):
         self.reset()
 
     def reset(self):
-        self.code = 4096 * [0]
+        self.code = array('H', 4096 * [0])
         self.ic = 0
         self.symbols = {}
         self.source = {}
 
     def plant(self, instruction, line):
-        self.code[self.ic] = instruction
+        self.code[self.ic] = instruction & 0o7777
         self.source[self.ic] = line
         self.ic += 1
 
@@ -224,6 +271,17 @@ class IotParser(Parser):
         return op
 
 
+class FieldParser(Parser):
+    def __init__(self, planter):
+        Parser.__init__(self, label + field, planter)
+
+    def build_instruction(self, parsed):
+        op = int(parsed['field'], self.base) & 0o0070
+        for code in parsed['fieldop'].split():
+            op |= fieldvalues[code]
+        return op
+
+
 class Org(Parser):
     def __init__(self, planter):
         Parser.__init__(self, org, planter)
@@ -231,6 +289,9 @@ class Org(Parser):
     def plant(self, parsed, line):
         self.planter.org(int(parsed['org'],self.base))
 
+    def allocate(self, parsed):
+        self.planter.org(int(parsed['org'],self.base))
+
 
 class ExprParser(Parser):
     def __init__(self, planter):
@@ -240,16 +301,6 @@ class ExprParser(Parser):
         return self.evaluate_expression(parsed)
 
 
-class LabelParser(Parser):
-    def __init__(self, planter):
-        Parser.__init__(self, label + characters, planter)
-
-    def plant(self, parsed, line):
-        if 'label' in parsed:
-            self.planter.define(parsed['label'])
-        self.planter.plant(0, line)
-
-
 class ChainBuilder():
     def __init__(self,*parsers):
         self.parsers = parsers
@@ -261,13 +312,15 @@ class ChainBuilder():
 
 
 class Pal():
-    def __init__(self, pdp8):
+    # cache, if given, is an ImageCache consulted before assembling
+    def __init__(self, pdp8, cache=None):
         self.pdp8 = pdp8
+        self.cache = cache
         self.planter = InstructionPlanter()
-        self.pass1 = ChainBuilder(Org(self.planter), LabelParser(self.planter)).build()
         self.pass2 = ChainBuilder(MriParser(self.planter),
                                   OprParser(self.planter),
                                   IotParser(self.planter),
+                                  FieldParser(self.planter),
                                   Org(self.planter),
                                   ExprParser(self.planter)
                                   ).build()
@@ -278,15 +331,26 @@ class Pal():
         self.pass2.parse_line(string)
         return self.planter.code[location]
 
-    def assemble(self, file_like, list_symbols=False):
+    # lines can be any iterable, such as a file, a generator or sys.stdin; it is only read once
+    def assemble(self, lines, list_symbols=False):
         self.planter.reset()
-        self.pass1.parse(file_like)
+        source = list(statements(lines))
+        key = self.cache.key('Pal', source) if self.cache else None
+        if key is None or not self.cache.load(key, self.planter):
+            # each statement is parsed once, in the first pass, and planted from what was parsed
+            parsed = []
+            for line in source:
+                (parser, statement) = self.pass2.recognise(line)
+                parser.allocate(statement)
+                parsed.append((parser, statement, line))
+            self.planter.ic = 0
+            for (parser, statement, line) in parsed:
+                parser.plant(statement, line)
+            if key is not None:
+                self.cache.store(key, self.planter)
         if list_symbols:
             symbols = self.planter.symbols
             for key in symbols:
                 print('%8s = %4d (%4o)' % (key, symbols[key], symbols[key]))
-        file_like.seek(0)
-        self.planter.ic = 0
-        self.pass2.parse(file_like)
         self.pdp8.memory = self.planter.code
         self.pdp8.tracer = PrintingTracer(self.planter.source)
@@ -0,0 +1,70 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from pdp8.core import PDP8, HALTED
+
+Job = namedtuple('Job', ['image', 'start', 'tape', 'budget'])
+Job.__new__.__defaults__ = ('', None)
+
+Result = namedtuple('Result', ['pc', 'accumulator', 'link', 'output', 'executed', 'cycles', 'halted'])
+
+
+machine = None  # each worker process keeps one PDP8 and reuses it for every job
+
+
+def worker_machine(fields):
+    global machine
+    if machine is None or machine.fields != fields:
+        machine = PDP8(fields)
+    return machine
+
+
+def run_job(fields, job):
+    machine = worker_machine(fields)
+    machine.reset()
+    machine.memory = job.image
+    machine.pc = job.start
+    result = machine.run(tape=job.tape, max_instructions=job.budget)
+    return Result(machine.pc, machine.accumulator, machine.link, machine.output,
+                  result.instructions, result.cycles, result.status == HALTED)
+
+
+def run_jobs(fields, jobs):
+    return [run_job(fields, job) for job in jobs]
+
+
+# Runs Jobs (an assembled image, start address, tape and optional instruction
+# budget) across a pool of worker processes and yields their Results in order.
+# Jobs are taken from the iterable as they are needed, chunksize at a time, and
+# only about two chunks per worker are in flight, so a long stream of jobs is
+# never all in memory at once.
+class JobPool(object):
+    def __init__(self, workers=None, fields=1):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.fields = fields
+        self.window = 2 * (workers or os.cpu_count() or 1)
+
+    def run(self, jobs, chunksize=1):
+        jobs = iter(jobs)
+        pending = deque()
+        while True:
+            while len(pending) < self.window:
+                chunk = list(islice(jobs, chunksize))
+                if not chunk:
+                    break
+                pending.append(self.executor.submit(run_jobs, self.fields, chunk))
+            if not pending:
+                return
+            for result in pending.popleft().result():
+                yield result
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
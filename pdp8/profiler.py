@@ -0,0 +1,95 @@
+from array import array
+from bisect import bisect_right
+
+from pdp8.core import HALTED, RunResult
+from pdp8.tracing import NullTracer
+
+
+# Counts how often each address is executed, and attributes the counts to the
+# labels in a symbol table such as InstructionPlanter.symbols.
+#
+# By default every instruction is counted, through the tracer interface, and
+# subroutine calls are followed: a JMS pushes a frame named after its target
+# and a JMP I back to the instruction after the JMS (or the one after that,
+# for subroutines that skip on return) pops it, giving a folded-stack profile
+# for flame graphs. With sample_every the program instead runs at full speed
+# in chunks of that many instructions, and only the pc between chunks is
+# counted, which costs next to nothing but gives no call stacks.
+class Profiler(NullTracer):
+    def __init__(self, symbols=None, sample_every=None):
+        self.symbols = symbols or {}
+        self.sample_every = sample_every
+        self.labels = sorted((address, label) for (label, address) in self.symbols.items())
+        self.addresses = [address for (address, _) in self.labels]
+        self.counts = array('L', 4096 * [0])
+        self.stacks = {}
+        self.frames = []  # (name, return address) for each active call
+        self.key = None
+
+    def run(self, pdp8, start=None, tape='', max_instructions=None, translate=False):
+        if start is not None:
+            pdp8.pc = start
+        if self.sample_every is None:
+            return pdp8.run(tape=tape, debugging=True, tracer=self, max_instructions=max_instructions)
+        executed = cycles = 0
+        status = None
+        while status != HALTED and executed != max_instructions:
+            chunk = self.sample_every
+            if max_instructions is not None:
+                chunk = min(chunk, max_instructions - executed)
+            result = pdp8.run(tape=tape, max_instructions=chunk, translate=translate)
+            tape = None
+            executed += result.instructions
+            cycles += result.cycles
+            status = result.status
+            self.counts[pdp8.pc & 0o7777] += 1
+        return RunResult(status, executed, cycles)
+
+    def instruction(self, old_pc, opcode, accumulator, link, new_pc):
+        self.counts[old_pc] += 1
+        if self.key is None:
+            self.key = self.label(old_pc)
+        self.stacks[self.key] = self.stacks.get(self.key, 0) + 1
+        if opcode & 0o7000 == 0o4000:  # JMS
+            self.frames.append((self.label(new_pc - 1), old_pc + 1))
+            self.key += ';' + self.frames[-1][0]
+        elif opcode & 0o7400 == 0o5400:  # JMP I
+            for depth in range(len(self.frames) - 1, -1, -1):
+                if new_pc - self.frames[depth][1] in (0, 1):
+                    del self.frames[depth:]
+                    self.key = ';'.join([self.key.split(';')[0]] + [name for (name, _) in self.frames])
+                    break
+
+    # the label at or before an address, with the offset from it
+    def label(self, address):
+        index = bisect_right(self.addresses, address) - 1
+        if index < 0:
+            return '%04o' % address
+        (start, label) = self.labels[index]
+        return label if start == address else '%s+%o' % (label, address - start)
+
+    def by_label(self):
+        totals = {}
+        for (address, count) in enumerate(self.counts):
+            if count:
+                index = bisect_right(self.addresses, address) - 1
+                label = self.labels[index][1] if index >= 0 else '%04o' % address
+                totals[label] = totals.get(label, 0) + count
+        return totals
+
+    def report(self, limit=None):
+        total = sum(self.counts) or 1
+        lines = ['%10s %5s  %-12s' % ('count', '%', 'label')]
+        for (label, count) in sorted(self.by_label().items(), key=lambda item: -item[1])[:limit]:
+            lines.append('%10d %5.1f  %-12s' % (count, 100.0 * count / total, label))
+        lines.append('')
+        lines.append('%10s %5s  %-6s %-12s' % ('count', '%', 'pc', 'label'))
+        hot = sorted((address for address in range(4096) if self.counts[address]), key=lambda a: -self.counts[a])
+        for address in hot[:limit]:
+            count = self.counts[address]
+            lines.append('%10d %5.1f  %04o   %-12s' % (count, 100.0 * count / total, address, self.label(address)))
+        return lines
+
+    # one line per call stack, as read by flamegraph.pl and speedscope
+    def folded(self):
+        return ['%s %d' % (stack, count) for (stack, count) in sorted(self.stacks.items())]
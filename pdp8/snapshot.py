@@ -0,0 +1,153 @@
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b'PDP8'
+VERSION = 6
+
+# where the tape is found on restore: nothing is left of it, it is held by the
+# Snapshot in memory (and is not saved with it), or it is a file named in the data
+NO_TAPE, TAPE_IN_MEMORY, TAPE_FILE = range(3)
+
+# magic, version, fields, pc, accumulator, link, punchflag, instruction field, data field,
+# instruction buffer, save field, field pending, interrupt enable, interrupt delay, reader buffer,
+# reader flag, cycles, reader and punch ready times (-1 if idle), where the tape is, the position
+# of the next character on it, length of the tape's filename, output length, length of the device states
+HEADER = struct.Struct('<4sBBHHBBBBBBBBBBBQqqBQQQQ')
+# each device state is preceded by the device code and the state's length
+DEVICE = struct.Struct('<BH')
+
+
+def pack_words(words):
+    if len(words) % 2:
+        words = words + array('H', [0])
+    packed = bytearray(3 * (len(words) // 2))
+    packed[0::3] = bytes(word >> 4 for word in words[0::2])
+    packed[1::3] = bytes(((even & 0o17) << 4) | (odd >> 8) for (even, odd) in zip(words[0::2], words[1::2]))
+    packed[2::3] = bytes(word & 0o377 for word in words[1::2])
+    return bytes(packed)
+
+
+def unpack_words(packed, count):
+    words = array('H', count * [0])
+    first, middle, last = packed[0::3], packed[1::3], packed[2::3]
+    words[0::2] = array('H', ((high << 4) | (low >> 4) for (high, low) in zip(first, middle)))
+    words[1::2] = array('H', (((high & 0o17) << 8) | low for (high, low) in zip(middle, last)))
+    return words
+
+
+# a tape file is mapped rather than read, so restoring costs no more memory than the reader would
+def mapped(filename):
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def ready(device):
+    return -1 if device.ready_at is None else device.ready_at
+
+
+# the states of the attached devices that have any, each under the first code it is attached at
+def device_states(pdp8):
+    states = []
+    seen = set()
+    for (code, device) in enumerate(pdp8.devices):
+        if device is not None and id(device) not in seen:
+            seen.add(id(device))
+            state = device.state()
+            if state:
+                states.append(DEVICE.pack(code, len(state)) + state)
+    return b''.join(states)
+
+
+def restore_devices(pdp8, states):
+    at = 0
+    while at < len(states):
+        (code, length) = DEVICE.unpack_from(states, at)
+        at += DEVICE.size
+        if pdp8.devices[code] is None:
+            raise ValueError('snapshot has a device at code %02o but the PDP8 has none' % code)
+        pdp8.devices[code].restore(bytes(states[at:at + length]))
+        at += length
+
+
+# A snapshot of a PDP8's complete state, held in a compact binary form with
+# memory packed two words to three bytes. The packed memory is unpacked once,
+# on the first restore; each restore after that is a single buffer copy, so
+# forking many runs from one snapshot is cheap. The tape is not copied: the
+# snapshot keeps the tape, or the name of its file, and the reader's position.
+class Snapshot(object):
+    def __init__(self, data, tape=None):
+        self.data = data
+        self.tape = tape
+        if len(data) < HEADER.size:
+            raise ValueError('not a PDP8 snapshot')
+        self.header = HEADER.unpack_from(data)
+        if self.header[0] != MAGIC or self.header[1] != VERSION:
+            raise ValueError('not a PDP8 snapshot')
+        self.image = None
+
+    # Without output, what the punch has printed is left out, and restoring
+    # leaves the punch as it is.
+    @classmethod
+    def of(cls, pdp8, output=True):
+        reader = pdp8.tape_reader
+        tape, position = reader.source()
+        if isinstance(tape, str):
+            (where, name, tape) = (TAPE_FILE, tape.encode('utf-8'), None)
+        elif position < len(tape):
+            (where, name) = (TAPE_IN_MEMORY, b'')
+        else:
+            (where, name, tape, position) = (NO_TAPE, b'', None, 0)
+        output = pdp8.output.encode('utf-8') if output else b''
+        states = device_states(pdp8)
+        header = HEADER.pack(MAGIC, VERSION, pdp8.fields, pdp8.pc, pdp8.accumulator, pdp8.link, pdp8.tape_punch.flag,
+                             pdp8.instruction_field, pdp8.data_field, pdp8.instruction_buffer, pdp8.save_field,
+                             pdp8.field_pending, pdp8.interrupt_enable, pdp8.interrupt_delay,
+                             reader.buffer, reader.flag, pdp8.cycles, ready(reader), ready(pdp8.tape_punch),
+                             where, position, len(name), len(output), len(states))
+        return cls(header + pack_words(pdp8.memory) + name + output + states, tape)
+
+    # maps the file rather than reading it
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.data)
+
+    def words(self):
+        return self.header[2] * 4096
+
+    def restore(self, pdp8, output=True):
+        (_, _, fields, pdp8.pc, pdp8.accumulator, pdp8.link, pdp8.tape_punch.flag,
+         pdp8.instruction_field, pdp8.data_field, pdp8.instruction_buffer, pdp8.save_field,
+         field_pending, interrupt_enable, interrupt_delay, buffer, flag, pdp8.cycles, reader_ready, punch_ready,
+         where, position, name_length, output_length, states_length) = self.header
+        if fields != pdp8.fields:
+            raise ValueError('snapshot has %d fields but the PDP8 has %d' % (fields, pdp8.fields))
+        start = HEADER.size + 3 * self.words() // 2
+        if self.image is None:
+            self.image = unpack_words(memoryview(self.data)[HEADER.size:start], self.words())
+        pdp8.memory = self.image
+        pdp8.field_pending = bool(field_pending)
+        pdp8.interrupt_enable = bool(interrupt_enable)
+        pdp8.interrupt_delay = bool(interrupt_delay)
+        if where == TAPE_FILE and self.tape is None:
+            self.tape = mapped(bytes(self.data[start:start + name_length]).decode('utf-8'))
+        elif where == TAPE_IN_MEMORY and self.tape is None:
+            raise ValueError('the snapshot\'s tape was held in memory and not saved with it')
+        pdp8.tape_reader.resume(b'' if where == NO_TAPE else self.tape, position, buffer, flag)
+        pdp8.tape_reader.ready_at = None if reader_ready < 0 else reader_ready
+        pdp8.tape_punch.ready_at = None if punch_ready < 0 else punch_ready
+        start += name_length
+        if output:
+            pdp8.output = bytes(self.data[start:start + output_length]).decode('utf-8')
+        start += output_length
+        restore_devices(pdp8, self.data[start:start + states_length])
+        pdp8.halted = False
+        pdp8.select_fields()
@@ -0,0 +1,147 @@
+import re
+from array import array
+
+LEADER = 0o200  # leader and trailer frames (channel 8 only)
+ORIGIN = 0o100  # channel 7 marks the first frame of an origin
+FIELD = 0o300  # channels 7 and 8 mark a field setting
+LEADER_LENGTH = 64
+
+# BIN tapes are origin and data frames, each word punched as two six-bit frames
+BIN_FRAMES = re.compile(rb'([\xc0-\xff])|([\x40-\x7f][\x00-\x3f])((?:[\x00-\x3f]{2})*)')
+# RIM tapes punch the address of every word in front of it
+RIM_FRAMES = re.compile(rb'(?:[\x40-\x7f][\x00-\x3f]{3})*')
+
+
+def frames(words):
+    packed = bytearray(2 * len(words))
+    packed[0::2] = bytes(word >> 6 & 0o77 for word in words)
+    packed[1::2] = bytes(word & 0o77 for word in words)
+    return packed
+
+
+def words_of(packed):
+    return array('H', ((high << 6) | low for (high, low) in zip(packed[0::2], packed[1::2])))
+
+
+def origin(address):
+    return bytes([ORIGIN | (address >> 6 & 0o77), address & 0o77])
+
+
+# The runs of consecutive addresses, such as those planted by an assembler, as
+# (address, words) segments of the image.
+def segments(image, addresses):
+    result = []
+    first = previous = None
+    for address in sorted(addresses):
+        if previous is not None and address != previous + 1:
+            result.append((first, image[first:previous + 1]))
+            first = None
+        if first is None:
+            first = address
+        previous = address
+    if first is not None:
+        result.append((first, image[first:previous + 1]))
+    return result
+
+
+# the body of a tape, between its leader and its trailer
+def body(tape):
+    start = 0
+    while start < len(tape) and tape[start] == LEADER:
+        start += 1
+    end = tape.find(bytes([LEADER]), start)
+    return tape[start:] if end < 0 else tape[start:end]
+
+
+# Segment addresses are absolute, so a segment in field 1 starts at 0o10000 or above.
+def punch_bin(segments, leader_length=LEADER_LENGTH):
+    tape = bytearray(leader_length * [LEADER])
+    checksum = 0
+    field = 0
+    for (address, words) in segments:
+        if address >> 12 != field:
+            field = address >> 12
+            tape.append(FIELD | (field & 0o7) << 3)  # field settings are not in the checksum
+        data = origin(address & 0o7777) + frames(words)
+        checksum += sum(data)
+        tape += data
+    tape += frames([checksum & 0o7777])
+    tape += bytes(leader_length * [LEADER])
+    return bytes(tape)
+
+
+def read_bin(tape):
+    data = body(tape)
+    runs = []
+    field = 0
+    checksum = 0
+    position = 0
+    for match in BIN_FRAMES.finditer(data):
+        if match.start() != position:
+            break
+        position = match.end()
+        if match.group(1):
+            field = (match.group(1)[0] >> 3) & 0o7
+            continue
+        checksum += sum(match.group(2)) + sum(match.group(3))
+        address = ((match.group(2)[0] & 0o77) << 6) | match.group(2)[1]
+        runs.append([(field << 12) + address, match.group(3)])
+    if position != len(data) or not runs or len(runs[-1][1]) < 2:
+        raise ValueError('malformed BIN tape')
+    # the last word on the tape is the checksum, not data
+    expected = words_of(runs[-1][1][-2:])[0]
+    checksum -= sum(runs[-1][1][-2:])
+    runs[-1][1] = runs[-1][1][:-2]
+    if checksum & 0o7777 != expected:
+        raise ValueError('BIN tape checksum is %04o but should be %04o' % (checksum & 0o7777, expected))
+    return [(address, words_of(packed)) for (address, packed) in runs if packed]
+
+
+def punch_rim(segments, leader_length=LEADER_LENGTH):
+    tape = bytearray(leader_length * [LEADER])
+    for (address, words) in segments:
+        if address >> 12:
+            raise ValueError('RIM tapes can only load field 0')
+        packed = bytearray(4 * len(words))
+        packed[0::4] = bytes(ORIGIN | ((address + offset) >> 6 & 0o77) for offset in range(len(words)))
+        packed[1::4] = bytes((address + offset) & 0o77 for offset in range(len(words)))
+        packed[2::4] = bytes(word >> 6 & 0o77 for word in words)
+        packed[3::4] = bytes(word & 0o77 for word in words)
+        tape += packed
+    tape += bytes(leader_length * [LEADER])
+    return bytes(tape)
+
+
+def read_rim(tape):
+    data = body(tape)
+    if RIM_FRAMES.fullmatch(data) is None:
+        raise ValueError('malformed RIM tape')
+    addresses = words_of(interleave(data[0::4], data[1::4]))
+    words = words_of(interleave(data[2::4], data[3::4]))
+    result = []
+    start = 0
+    for index in range(1, len(addresses) + 1):
+        if index == len(addresses) or addresses[index] != addresses[index - 1] + 1:
+            result.append((addresses[start], words[start:index]))
+            start = index
+    return result
+
+
+def interleave(high, low):
+    packed = bytearray(2 * len(high))
+    packed[0::2] = bytes(frame & 0o77 for frame in high)
+    packed[1::2] = low
+    return packed
+
+
+def load(pdp8, segments):
+    for (address, words) in segments:
+        pdp8.deposit(address, words)
+
+
+def load_bin(pdp8, tape):
+    load(pdp8, read_bin(tape))
+
+
+def load_rim(pdp8, tape):
+    load(pdp8, read_rim(tape))
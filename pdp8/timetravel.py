@@ -0,0 +1,100 @@
+from collections import deque
+
+from pdp8.core import HALTED, RunResult
+from pdp8.snapshot import Snapshot
+
+
+# Records a run so that it can be moved backwards and forwards through. A
+# snapshot is taken every interval instructions and the most recent
+# checkpoints are kept; going to an instruction count restores the nearest
+# checkpoint at or before it and replays forward from there, going no further
+# than the HLT if the run has halted.
+#
+# A checkpoint holds the registers, packed memory and device states. The tape
+# is kept by reference with the reader's position, and the punch's output as
+# its length, put back from a single copy of the longest output seen; memory is
+# bounded by the number of checkpoints, whatever the length of the tape or output.
+#
+# Replay relies on the run being deterministic, which it is for the built-in
+# devices; a punch with a sink of its own sees replayed output again.
+class TimeMachine(object):
+    def __init__(self, pdp8, interval=100000, checkpoints=64):
+        self.pdp8 = pdp8
+        self.interval = interval
+        self.checkpoints = deque(maxlen=checkpoints)
+        self.count = 0  # instructions executed since recording started
+        self.end = 0  # the furthest count reached so far
+        self.halted_at = None  # the count at which the recorded run halted, if it has
+        self.printed = ''  # the longest output seen, when the punch has no sink
+
+    def checkpoint(self):
+        if not self.checkpoints or self.checkpoints[-1][0] < self.count:
+            punch = self.pdp8.tape_punch
+            output = punch.length() if punch.sink is None else None
+            self.checkpoints.append((self.count, Snapshot.of(self.pdp8, output=False), output))
+
+    # the output is put back from the longest output seen, which every checkpoint's begins
+    def rewind(self, checkpoint):
+        (self.count, snapshot, output) = checkpoint
+        snapshot.restore(self.pdp8, output=False)
+        if output is not None:
+            punch = self.pdp8.tape_punch
+            if punch.length() > len(self.printed):
+                self.printed = punch.text()
+            punch.replace(self.printed[:output])
+
+    # runs like PDP8.run, taking checkpoints as it goes
+    def record(self, start=None, tape='', max_instructions=None, translate=False):
+        self.count = self.end = 0
+        self.halted_at = None
+        self.printed = ''
+        self.checkpoints.clear()
+        if start is not None:
+            self.pdp8.pc = start
+        if tape is not None:
+            self.pdp8.tape_reader.load(tape)  # before the first checkpoint is taken
+        result = self.advance(max_instructions, None, translate)
+        self.end = self.count
+        return result
+
+    def advance(self, max_instructions, tape=None, translate=False):
+        executed = cycles = 0
+        status = None
+        while status != HALTED and executed != max_instructions:
+            if self.count % self.interval == 0:
+                self.checkpoint()
+            chunk = self.interval - self.count % self.interval
+            if max_instructions is not None:
+                chunk = min(chunk, max_instructions - executed)
+            result = self.pdp8.run(tape=tape, max_instructions=chunk, translate=translate)
+            tape = None
+            executed += result.instructions
+            cycles += result.cycles
+            self.count += result.instructions
+            status = result.status
+        self.end = max(self.end, self.count)
+        if status == HALTED:
+            self.halted_at = self.count
+        return RunResult(status, executed, cycles)
+
+    def goto(self, count):
+        if count < 0:
+            raise ValueError('cannot go to instruction %d' % count)
+        if self.halted_at is not None:
+            count = min(count, self.halted_at)  # there is nothing after the HLT
+        best = None
+        for checkpoint in self.checkpoints:
+            if checkpoint[0] <= count:
+                best = checkpoint
+        if best is None:
+            raise ValueError('instruction %d is before the oldest checkpoint' % count)
+        if not self.count <= count or best[0] > self.count:  # otherwise carry on from where we are
+            self.rewind(best)
+        if count > self.count:
+            self.advance(count - self.count)
+
+    def step(self, instructions=1):
+        self.goto(self.count + instructions)
+
+    def step_back(self, instructions=1):
+        self.goto(self.count - instructions)
@@ -0,0 +1,61 @@
+from collections import namedtuple
+from time import monotonic, sleep
+
+from pdp8.core import RunResult, BUDGET_EXHAUSTED
+
+# cycle_time is the memory cycle time in microseconds
+Profile = namedtuple('Profile', ['name', 'cycle_time'])
+
+PDP8E = Profile('PDP-8/E', 1.2)
+PDP8I = Profile('PDP-8/I', 1.5)
+PDP8S = Profile('PDP-8/S', 8.0)  # the serial /S is much slower; this only approximates it
+
+PROFILES = {profile.name: profile for profile in (PDP8E, PDP8I, PDP8S)}
+
+
+# Converts the memory cycles counted by a PDP8 into emulated time.
+class TimingModel(object):
+    def __init__(self, pdp8, profile=PDP8E):
+        self.pdp8 = pdp8
+        self.profile = profile
+        self.start = pdp8.cycles
+
+    def reset(self):
+        self.start = self.pdp8.cycles
+
+    def microseconds(self):
+        return (self.pdp8.cycles - self.start) * self.profile.cycle_time
+
+
+# Paces a PDP8 to the speed of the hardware it models. The machine runs
+# flat out for a slice of emulated time and then sleeps off however far it
+# has got ahead of the wall clock, so there is one sleep per slice rather
+# than one per instruction.
+class Throttle(object):
+    def __init__(self, pdp8, profile=PDP8E, slice_time=0.02, clock=monotonic, sleeper=sleep):
+        self.pdp8 = pdp8
+        self.timing = TimingModel(pdp8, profile)
+        self.slice_cycles = max(1, int(slice_time * 1e6 / profile.cycle_time))
+        self.clock = clock
+        self.sleeper = sleeper
+
+    def run(self, start=None, tape='', max_instructions=None, translate=False):
+        self.timing.reset()
+        began = self.clock()
+        executed = 0
+        cycles_per_instruction = 2.0  # refined from each slice
+        while True:
+            chunk = max(1, int(self.slice_cycles / cycles_per_instruction))
+            if max_instructions is not None:
+                chunk = min(chunk, max_instructions - executed)
+            result = self.pdp8.run(start=start, tape=tape, max_instructions=chunk, translate=translate)
+            start, tape = None, None
+            executed += result.instructions
+            if result.instructions:
+                cycles_per_instruction = float(result.cycles) / result.instructions
+            ahead = self.timing.microseconds() / 1e6 - (self.clock() - began)
+            if ahead > 0:
+                self.sleeper(ahead)
+            if result.status != BUDGET_EXHAUSTED or executed == max_instructions:
+                break
+        return RunResult(result.status, executed, self.pdp8.cycles - self.timing.start)
@@ -1,5 +1,12 @@
+import struct
 from abc import ABCMeta, abstractmethod
 
+# old pc, instruction, accumulator, new pc, address written, contents written, flags
+RECORD = struct.Struct('<HHHHHiB')
+LINK = 1
+WRITE = 2
+HALT = 4
+
 
 class Tracer(object): # pragma: no cover
     __metaclass__ = ABCMeta
@@ -16,6 +23,10 @@ class Tracer(object): # pragma: no cover
     def halt(self, pc):
         pass
 
+    # called when a run ends, whether or not it halted
+    def finished(self):
+        pass
+
 
 class NullTracer(Tracer): # pragma: no cover
     def instruction(self, old_pc, opcode, accumulator, link, new_pc):
@@ -32,21 +43,105 @@ def signed(accumulator):
     return accumulator if accumulator < 2**11 else accumulator-2**12
 
 
+def memset_line(address, contents):
+    return '%5d (0o%04o)<=%d' % (address, address, contents)
+
+
+def instruction_line(source, old_pc, accumulator, link, new_pc, memset):
+    return (' %30s @ %5d  ac: %5d/%-5d (%04o) l: %d PC(after): %5d %s' %
+            (source[old_pc], old_pc, accumulator, signed(accumulator), accumulator, link, new_pc, memset))
+
+
+def halt_line(pc):
+    return 'Halted at %d(%o)' % (pc, pc)
+
+
 class PrintingTracer(Tracer):
     def __init__(self, source):
         self.source = source
         self.memset = ''
 
     def setting(self, address, contents):
-        self.memset = '%5d (0o%04o)<=%d' % (address, address, contents)
+        self.memset = memset_line(address, contents)
 
     def instruction(self, old_pc, opcode, accumulator, link, new_pc):
-        print(' %30s @ %5d  ac: %5d/%-5d (%04o) l: %d PC(after): %5d %s' %
-              (self.source[old_pc], old_pc, accumulator, signed(accumulator), accumulator, link, new_pc, self.memset))
+        print(instruction_line(self.source, old_pc, accumulator, link, new_pc, self.memset))
         self.memset = ''
 
     def halt(self, pc):
-        print('Halted at %d(%o)' % (pc, pc))
+        print(halt_line(pc))
+
+
+# Records each instruction as a fixed-width packed struct in a preallocated
+# ring buffer, leaving the formatting until later. With a (binary) file the
+# buffer is written out whenever it fills and at the end of each run; without
+# one it keeps the most recent records, overwriting the oldest.
+class BinaryTraceRecorder(Tracer):
+    def __init__(self, file=None, capacity=4096):
+        self.file = file
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.count = 0
+        self.wrapped = False
+        self.address = self.contents = None
+
+    def setting(self, address, contents):
+        self.address, self.contents = address, contents
+
+    def instruction(self, old_pc, opcode, accumulator, link, new_pc):
+        flags = LINK if link else 0
+        if self.address is None:
+            RECORD.pack_into(self.buffer, self.count * RECORD.size, old_pc, opcode, accumulator, new_pc, 0, 0, flags)
+        else:
+            RECORD.pack_into(self.buffer, self.count * RECORD.size, old_pc, opcode, accumulator, new_pc,
+                             self.address, self.contents, flags | WRITE)
+            self.address = self.contents = None
+        self.count += 1
+        if self.count == self.capacity:
+            self.full()
+
+    def halt(self, pc):
+        RECORD.pack_into(self.buffer, self.count * RECORD.size, pc, 0, 0, pc, 0, 0, HALT)
+        self.count += 1
+        if self.count == self.capacity:
+            self.full()
+
+    def full(self):
+        if self.file is None:
+            self.wrapped = True
+            self.count = 0
+        else:
+            self.flush()
+
+    def finished(self):
+        self.flush()
+
+    def flush(self):
+        if self.file is not None and self.count:
+            self.file.write(memoryview(self.buffer)[:self.count * RECORD.size])
+            self.count = 0
+
+    # the records held in the buffer, oldest first
+    def records(self):
+        end = self.count * RECORD.size
+        if self.wrapped:
+            return bytes(self.buffer[end:] + self.buffer[:end])
+        return bytes(self.buffer[:end])
+
+
+def decode_trace(data):
+    return RECORD.iter_unpack(data)
+
+
+# Renders recorded trace data in the same format as PrintingTracer, given the
+# source map of the program, such as InstructionPlanter.source.
+def render_trace(data, source):
+    for (old_pc, opcode, accumulator, new_pc, address, contents, flags) in decode_trace(data):
+        if flags & HALT:
+            yield halt_line(old_pc)
+        else:
+            memset = memset_line(address, contents) if flags & WRITE else ''
+            yield instruction_line(source, old_pc, accumulator, flags & LINK, new_pc, memset)
 
 
 class HaltTracer(NullTracer):
@@ -0,0 +1,358 @@
+MAX_BLOCK_LENGTH = 64
+MAX_COMPILED = 4096
+HALTS = (0o7402, 0o7602)  # HLT and CLA HLT, which end a block
+
+# Compiled block functions, shared by every PDP8 and keyed by the block's
+# address and words, so machines running the same program compile it once.
+COMPILED = {}
+
+
+def tad_source(operand):
+    return ['ac += %s' % operand,
+            'if ac > 0o7777:',
+            '    ac &= 0o7777',
+            '    link = 1',
+            'else:',
+            '    link = 0']
+
+
+# Mirrors PDP8.group1, including the order in which the micro-operations are applied.
+def group1_source(instruction):
+    lines = []
+    if instruction & 0o0200:
+        lines.append('ac = 0')
+    if instruction & 0o0100:
+        lines.append('link = 0')
+    if instruction & 0o0040:
+        lines.append('ac ^= 0o7777')
+    if instruction & 0o0020:
+        lines.append('link = 1 - link')
+    if instruction & 0o0001:
+        lines.extend(tad_source('1'))
+    for _ in range(2 if instruction & 0o0002 else 1):
+        if instruction & 0o0010:
+            lines.append('ac, link = (ac >> 1) | (0o4000 if link else 0), ac & 1')
+    for _ in range(2 if instruction & 0o0002 else 1):
+        if instruction & 0o0004:
+            lines.append('ac, link = ((ac << 1) & 0o7777) | (1 if link else 0), ac >> 11')
+    return lines
+
+
+# Mirrors PDP8.group2; returns None if the instruction can never skip.
+def group2_skip_condition(instruction):
+    if instruction & 0o0010:
+        terms = []
+        if instruction & 0o0100:
+            terms.append('not ac & 0o4000')
+        if instruction & 0o0040:
+            terms.append('ac != 0')
+        if instruction & 0o0020:
+            terms.append('link == 0')
+        return ' and '.join(terms) if terms else 'True'
+    terms = []
+    if instruction & 0o0100:
+        terms.append('ac & 0o4000')
+    if instruction & 0o0040:
+        terms.append('ac == 0')
+    if instruction & 0o0020:
+        terms.append('link == 1')
+    return ' or '.join(terms) if terms else None
+
+
+class Block(object):
+    def __init__(self, function, first, last, words):
+        self.function = function
+        self.first = first
+        self.last = last
+        self.length = last - first + 1
+        self.words = words
+
+
+class BlockTranslator(object):
+    def __init__(self, pdp8):
+        self.pdp8 = pdp8
+        self.blocks = {}
+        self.covered = {}
+        self.stored = set()  # addresses the program has stored into while they were translated
+        self.image = None  # the field's memory, as bytes, when the last translated run ended
+        self.field = 0
+
+    # blocks are translated from the current instruction field
+    def select_field(self, field):
+        if field != self.field:
+            self.flush()
+            self.field = field
+
+    def flush(self):
+        self.blocks.clear()
+        self.covered.clear()
+        self.stored.clear()
+        self.image = None
+
+    # Called when the program stores into a translated word. The word is left out
+    # of blocks from then on, so self-modified code is interpreted rather than
+    # being translated again on every change.
+    def invalidate(self, address):
+        self.stored.add(address)
+        self.discard(address)
+
+    def discard(self, address):
+        for entry in self.covered.pop(address, ()):
+            block = self.blocks.pop(entry, None)
+            if block is not None:
+                for other in range(block.first, block.last + 1):
+                    if other != address:
+                        self.covered.get(other, set()).discard(entry)
+
+    # Memory may have been written directly, bypassing PDP8.__setitem__, between
+    # runs; the blocks are only checked one by one if the field has changed at all.
+    def revalidate(self, memory):
+        image = memory.tobytes()
+        if image == self.image:
+            return
+        for (entry, block) in list(self.blocks.items()):
+            if image[2 * block.first:2 * block.last + 2] != block.words:
+                self.discard(entry)
+
+    def remember(self, memory):
+        self.image = memory.tobytes()
+
+    def block_at(self, pc):
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.translate(pc)
+        return block
+
+    def translate(self, pc):
+        memory = self.pdp8.imem
+        instructions = [] if pc in self.stored else self.walk(memory, pc)
+        function = None  # nothing to translate; the interpreter executes the instruction at pc
+        if instructions:
+            function = compiled(pc, instructions)
+        last = pc + max(len(instructions), 1) - 1
+        block = Block(function, pc, last, memory[pc:last + 1].tobytes())
+        self.blocks[pc] = block
+        for address in range(pc, last + 1):
+            self.covered.setdefault(address, set()).add(pc)
+        return block
+
+    # Collects the straight-line run of instructions that starts at pc.
+    def walk(self, memory, pc):
+        instructions = []
+        at = pc
+        while len(instructions) < MAX_BLOCK_LENGTH and at < len(memory):
+            if at in self.stored and at != pc:
+                break
+            instruction = memory[at]
+            op = instruction >> 9
+            if op == 6:
+                break  # IOTs are left to the interpreter
+            if op == 7 and (instruction & 0o0400) and ((instruction & 0o0001) or (instruction & 0o0002)):
+                if instruction in HALTS:
+                    instructions.append(instruction)
+                break  # other operate instructions with these bits are left to the interpreter
+            instructions.append(instruction)
+            if op in (2, 4, 5):
+                break  # ISZ, JMS and JMP
+            if op == 7 and (instruction & 0o0400) and group2_skip_condition(instruction) is not None:
+                break
+            if op == 3 and instruction & 0o0400:
+                break  # the store might land anywhere, including later in this block
+            at += 1
+        if instructions and is_skip(instructions[-1]):
+            at = pc + len(instructions)
+            if (at < len(memory) and (memory[at] & 0o7000) == 0o5000 and at not in self.stored and
+                    not changes(at - 1, instructions[-1], at)):
+                instructions.append(memory[at])  # fuse the JMP that the skip jumps over
+        # end the block after the first DCA that stores into a later instruction of it
+        for (offset, instruction) in enumerate(instructions):
+            if instruction >> 9 == 3 and pc + offset < direct_address(pc + offset, instruction) < pc + len(instructions):
+                return instructions[:offset + 1]
+        return instructions
+
+
+def compiled(pc, instructions):
+    key = (pc, tuple(instructions))
+    function = COMPILED.get(key)
+    if function is None:
+        if len(COMPILED) >= MAX_COMPILED:
+            COMPILED.clear()
+        namespace = {}
+        source = '\n'.join(BlockWriter(pc, instructions).lines())
+        exec(compile(source, '<block 0o%04o>' % pc, 'exec'), namespace)
+        function = COMPILED[key] = namespace['block']
+    return function
+
+
+def direct_address(at, instruction):
+    address = instruction & 0o0177
+    if not instruction & 0o0200:
+        address += at & 0o7600
+    return address
+
+
+# whether the ISZ at at might increment the word at address
+def changes(at, instruction, address):
+    if instruction >> 9 != 2:
+        return False
+    return bool(instruction & 0o0400) or direct_address(at, instruction) == address
+
+
+# Mirrors the memory cycle counts used by PDP8.decode.
+def instruction_cycles(instruction):
+    op = instruction >> 9
+    if op >= 6:
+        return 1
+    return (1 if op == 5 else 2) + (1 if instruction & 0o0400 else 0)
+
+
+def is_skip(instruction):
+    if instruction >> 9 == 2:
+        return True
+    return instruction >> 9 == 7 and bool(instruction & 0o0400) and group2_skip_condition(instruction) is not None
+
+
+class BlockWriter(object):
+    def __init__(self, pc, instructions):
+        self.pc = pc
+        self.instructions = instructions
+        self.length = len(instructions)
+        self.cycles = [instruction_cycles(instruction) for instruction in instructions]
+        self.looping = self.can_loop()
+        self.indent = '        '
+        self.body = []
+        self.ia = None
+        self.stores = False
+        self.covers = {}  # direct store addresses -> locals saying whether each is translated
+
+    def can_loop(self):
+        final = self.instructions[-1]
+        if self.length < 2 or (final & 0o7400) != 0o5000 or not is_skip(self.instructions[-2]):
+            return False
+        if direct_address(self.pc + self.length - 1, final) != self.pc:
+            return False
+        for (offset, instruction) in enumerate(self.instructions):
+            op = instruction >> 9
+            if op in (2, 3, 4):
+                if instruction & 0o0400:
+                    return False
+                target = direct_address(self.pc + offset, instruction)
+                if self.pc <= target < self.pc + self.length:
+                    return False
+        return True
+
+    def lines(self):
+        for (offset, instruction) in enumerate(self.instructions):
+            self.translate(self.pc + offset, offset, instruction)
+        final = self.instructions[-1]
+        if (final >> 9) not in (4, 5):
+            self.exit(self.pc + self.length, self.length, final, self.ia)
+        prologue = ['def block(pdp, memory, data, limit):']
+        epilogue = ['    pdp.halt()'] if final in HALTS else []
+        if self.stores:
+            # nothing is translated while a block runs, so direct addresses are looked up once
+            prologue += ['    translator = pdp.translator',
+                         '    covered = translator.covered']
+            prologue += ['    %s = %s in covered' % (name, address) for (address, name) in sorted(self.covers.items())]
+        return (prologue +
+                ['    ac = pdp.accumulator',
+                 '    link = pdp.link',
+                 '    executed = cycles = 0',
+                 '    while True:'] +
+                self.body +
+                ['    pdp.accumulator = ac',
+                 '    pdp.link = link',
+                 '    pdp.pc = pc',
+                 '    pdp.cycles += cycles'] +
+                epilogue +
+                ['    return executed'])
+
+    def emit(self, *lines):
+        self.body.extend(self.indent + line for line in lines)
+
+    def exit(self, pc, executed, instruction, address):
+        self.emit('pc = %s' % pc,
+                  'executed += %d' % executed,
+                  'cycles += %d' % sum(self.cycles[:executed]),
+                  'pdp.instruction, pdp.ia = 0o%04o, %s' % (instruction, address),
+                  'break')
+
+    def operand(self, at, instruction):
+        self.ia = '0o%04o' % direct_address(at, instruction)
+        if instruction & 0o0400:
+            self.emit('address = memory[%s]' % self.ia)
+            self.ia = 'address'
+        return self.ia
+
+    def store(self, field, address, value):
+        self.stores = True
+        if address == 'address':
+            covers = 'address in covered'
+        else:
+            covers = self.covers.setdefault(address, 'covers_%s' % address[2:])
+        self.emit('%s[%s] = %s' % (field, address, value),
+                  'if %s:' % covers,
+                  '    translator.invalidate(%s)' % address)
+
+    def translate(self, at, offset, instruction):
+        self.emit('# 0o%04o: 0o%04o' % (at, instruction))
+        op = instruction >> 9
+        if op == 7:
+            if not instruction & 0o0400:
+                self.ia = '0o%04o' % direct_address(at, instruction)
+                self.emit(*group1_source(instruction))
+            else:
+                self.group2(at, offset, instruction)
+            return
+        address = self.operand(at, instruction)
+        field = 'data' if instruction & 0o0400 else 'memory'  # indirect operands are in the data field
+        if op == 0:
+            self.emit('ac &= %s[%s]' % (field, address))
+        elif op == 1:
+            self.emit(*tad_source('%s[%s]' % (field, address)))
+        elif op == 2:
+            self.emit('contents = (%s[%s] + 1) & 0o7777' % (field, address))
+            self.store(field, address, 'contents')
+            self.emit('if contents == 0:')
+            self.indented(self.exit, at + 2, offset + 1, instruction, address)
+        elif op == 3:
+            self.store(field, address, 'ac')
+            self.emit('ac = 0')
+        elif op == 4:
+            self.store('memory', address, '0o%04o' % ((at + 1) & 0o7777))
+            self.exit('%s + 1' % address, offset + 1, instruction, address)
+        elif offset > 0 and is_skip(self.instructions[offset - 1]):
+            self.jump_back(at, offset, instruction, address)
+        else:
+            self.exit(address, offset + 1, instruction, address)
+
+    def group2(self, at, offset, instruction):
+        condition = group2_skip_condition(instruction)
+        cla = ['ac = 0'] if instruction & 0o0200 else []
+        pointer = 'memory[0o%04o]' % direct_address(at, instruction)
+        self.ia = pointer
+        if condition is None:
+            self.emit(*cla)
+            return
+        self.emit('if %s:' % condition)
+        self.indented(self.emit, *cla)
+        self.indented(self.exit, at + 2, offset + 1, instruction, pointer)
+        self.emit(*cla)
+
+    def jump_back(self, at, offset, instruction, address):
+        if not self.looping:
+            self.exit(address, offset + 1, instruction, address)
+            return
+        self.emit('executed += %d' % self.length,
+                  'cycles += %d' % sum(self.cycles),
+                  'if executed + %d > limit:' % self.length)
+        self.indent += '    '
+        self.emit('pc = %s' % address,
+                  'pdp.instruction, pdp.ia = 0o%04o, %s' % (instruction, address),
+                  'break')
+        self.indent = self.indent[:-4]
+
+    def indented(self, emitter, *args):
+        self.indent += '    '
+        emitter(*args)
+        self.indent = self.indent[:-4]
@@ -0,0 +1,116 @@
+from array import array
+from collections import namedtuple
+
+from pdp8.core import PDP8
+
+READ = 1
+WRITE = 2
+EXECUTE = 4
+
+Hit = namedtuple('Hit', ['kind', 'address', 'pc', 'contents'])
+
+
+# A PDP8 whose memory accesses are reported to a Watcher. A Watcher swaps a
+# machine's class to this one, or to a subclass of this and the machine's own
+# class, only while it is watching, so unwatched runs keep the plain accessors
+# and the fast run loops. Every instruction goes through execute, so reads,
+# writes and instruction fetches are all seen; addresses include the field.
+class WatchedPDP8(PDP8):
+    def __getitem__(self, address):
+        contents = self._memory[address]
+        self.watcher.access(READ, address, contents)
+        return contents
+
+    def __setitem__(self, address, contents):
+        super().__setitem__(address, contents)
+        self.watcher.access(WRITE, address, self._memory[address])
+
+    def execute(self):
+        address = self.ibase + self.pc
+        word = self._memory[address]
+        self.watcher.pc = address
+        self.watcher.access(EXECUTE, address, word)
+        if word & 0o0400 and word >> 9 < 6:  # the pointer of an indirect MRI is read too
+            pointer = self.ibase + (word & 0o0177) + (0 if word & 0o0200 else self.pc & 0o7600)
+            self.watcher.access(READ, pointer, self._memory[pointer])
+        super().execute()
+
+    def run_fast(self, max_instructions=None):
+        return self.run_instrumented(max_instructions, None)
+
+    def run_translated(self, max_instructions=None):
+        return self.run_instrumented(max_instructions, None)
+
+
+WATCHED = {PDP8: WatchedPDP8}
+
+
+# the watched class for machines of class cls, which keeps cls's own methods
+def watched(cls):
+    if cls not in WATCHED:
+        WATCHED[cls] = type('Watched' + cls.__name__, (WatchedPDP8, cls), {})
+    return WATCHED[cls]
+
+
+# Counts reads, writes and executions of every address, and records hits on
+# watchpoints, which cover a range of addresses for some kinds of access. By
+# default a hit stops the run, with status STOPPED, after the instruction that
+# made the access. Use as a context manager, or call start and stop.
+class Watcher(object):
+    def __init__(self, pdp8, stop=True):
+        self.pdp8 = pdp8
+        self.original = None  # the machine's class while it is being watched
+        self.stop_on_hit = stop
+        size = len(pdp8.memory)
+        self.reads = array('L', size * [0])
+        self.writes = array('L', size * [0])
+        self.executions = array('L', size * [0])
+        self.counters = {READ: self.reads, WRITE: self.writes, EXECUTE: self.executions}
+        self.watched = bytearray(size)
+        self.hits = []
+        self.pc = None
+
+    def watch(self, first, last=None, kinds=READ | WRITE | EXECUTE):
+        for address in range(first, (first if last is None else last) + 1):
+            self.watched[address] |= kinds
+
+    def unwatch(self, first, last=None):
+        for address in range(first, (first if last is None else last) + 1):
+            self.watched[address] = 0
+
+    def access(self, kind, address, contents):
+        self.counters[kind][address] += 1
+        if self.watched[address] & kind:
+            self.hits.append(Hit(kind, address, self.pc, contents))
+            if self.stop_on_hit:
+                self.pdp8.running = False
+                self.pdp8.stopped = True
+
+    def start(self):
+        if self.original is None:
+            self.original = self.pdp8.__class__
+            self.pdp8.watcher = self
+            self.pdp8.__class__ = watched(self.original)
+
+    def stop(self):
+        if self.original is not None:
+            self.pdp8.__class__ = self.original
+            self.original = None
+            del self.pdp8.watcher
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exception):
+        self.stop()
+
+    # the addresses with the most accesses of the given kinds, busiest first
+    def hottest(self, kinds=READ | WRITE | EXECUTE, limit=10):
+        totals = {}
+        for (kind, counter) in self.counters.items():
+            if kinds & kind:
+                for (address, count) in enumerate(counter):
+                    if count:
+                        totals[address] = totals.get(address, 0) + count
+        return sorted(totals.items(), key=lambda item: -item[1])[:limit]
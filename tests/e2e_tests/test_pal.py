@@ -1,9 +1,10 @@
 from io import StringIO
 from unittest import TestCase
+from unittest.mock import patch
 
 from tests.helpers.checker import PDPChecker
 from pdp8.core import PDP8, octal
-from pdp8.pal import Pal
+from pdp8.pal import Pal, Parser, statements
 
 
 def read(filename):
@@ -47,3 +48,27 @@ class PalTest(TestCase):
         self.pal.assemble(StringIO(read('isz-test.pal')), list_symbols=True)
         self.pdp8.run(start=octal('200'), debugging=True)
         self.checker.check(accumulator=0)
+
+    def test_assembles_from_a_generator(self):
+        lines = (line for line in read('mult.pal').splitlines())
+        self.pal.assemble(lines)
+        self.pdp8.run(start=octal('200'))
+        self.checker.check(accumulator=648)
+
+    def test_parses_each_statement_once(self):
+        matched = []
+        match = Parser.match
+
+        def counting(parser, statement, line):
+            parsed = match(parser, statement, line)
+            if parsed is not None:
+                matched.append(line)
+            return parsed
+        with patch.object(Parser, 'match', counting):
+            self.pal.assemble(StringIO(read('mul-sub.pal')))
+        self.assertEqual(len(matched), len(list(statements(StringIO(read('mul-sub.pal'))))))
+
+    def test_copies_tape_to_punch(self):
+        self.pal.assemble(StringIO(read('copy.pal')))
+        self.pdp8.run(start=octal('200'), tape='HELLO. WORLD')
+        self.checker.check(output='HELLO')
@@ -0,0 +1,4 @@
+def read(filename):
+    with open('data/'+filename) as f:
+        data = f.read()
+    return data
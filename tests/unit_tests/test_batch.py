@@ -0,0 +1,66 @@
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.batch import PDP8Batch
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.tracing import NullTracer
+from tests.helpers.files import read
+
+
+class BatchTest(TestCase):
+    def assemble(self, filename):
+        pdp = PDP8()
+        pal = Pal(pdp)
+        pal.assemble(StringIO(read(filename)))
+        return pal.planter.code
+
+    def run_single(self, image):
+        pdp = PDP8()
+        pdp.memory = image
+        pdp.tracer = NullTracer()
+        pdp.run(start=octal('200'))
+        return pdp
+
+    def test_lanes_match_single_machines(self):
+        image = self.assemble('mult.pal')
+        batch = PDP8Batch(3)
+        batch.load(image)
+        for lane in range(3):
+            batch.memory[lane, octal('211')] = lane + 1  # B
+        batch.run(start=octal('200'))
+        for lane in range(3):
+            lane_image = image[:]
+            lane_image[octal('211')] = lane + 1
+            pdp = self.run_single(lane_image)
+            assert_that(int(batch.accumulator[lane]), equal_to(pdp.accumulator))
+            assert_that(int(batch.link[lane]), equal_to(pdp.link))
+            assert_that(int(batch.pc[lane]), equal_to(pdp.pc))
+            assert_that(list(batch.memory[lane]), equal_to(list(pdp.memory)))
+
+    def test_divergent_lanes_halt_independently(self):
+        image = self.assemble('isz-test.pal')
+        batch = PDP8Batch(2)
+        batch.load(image)
+        batch.memory[0, octal('100')] = octal('7776')
+        batch.run(start=octal('200'))
+        assert_that(list(batch.executed), equal_to([5, 3]))
+
+    def test_punch_output_per_lane(self):
+        image = self.assemble('hello.pal')
+        batch = PDP8Batch(2)
+        batch.load(image)
+        batch.run(start=octal('200'))
+        assert_that(batch.output(1), equal_to('HELLO, WORLD!\r\n'))
+
+    def test_punch_keeps_eight_bits(self):
+        pal = Pal(PDP8())
+        pal.assemble(['*200', 'TAD C', 'TLS', 'HLT', 'C, 1101'])
+        image = pal.planter.code
+        batch = PDP8Batch(1)
+        batch.load(image)
+        batch.run(start=octal('200'))
+        assert_that(batch.output(0), equal_to(self.run_single(image).output))
+        assert_that(batch.output(0), equal_to('A'))
@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from benchmarks.benchmark import assemble, assembler_source, regressions, run_rate, synthetic, BODIES
+from pdp8.core import PDP8
+from pdp8.fastpal import FastPal
+from pdp8.pal import Pal
+
+
+class BenchmarkTest(TestCase):
+    def test_synthetic_loops_halt(self):
+        for body in BODIES.values():
+            for translate in [False, True]:
+                assert_that(run_rate(synthetic(body, 1), minimum=1, repeats=1, translate=translate) > 0, equal_to(True))
+
+    def test_assemblers_agree_on_the_source(self):
+        source = assembler_source(pages=2)
+        (slow, fast) = (PDP8(), PDP8())
+        assemble(Pal, slow, source)
+        assemble(FastPal, fast, source)
+        assert_that(list(fast.memory), equal_to(list(slow.memory)))
+        assert_that(slow[0o200], equal_to(0o7300))
+
+    def test_regressions(self):
+        baseline = {'run/fast/mult': 1000.0, 'run/fast/opr': 1000.0, 'assemble/Pal': 100.0}
+        results = {'run/fast/mult': 950.0, 'run/fast/opr': 850.0, 'assemble/FastPal': 10.0}
+        assert_that(regressions(baseline, results, 0.1), equal_to({'run/fast/opr': (1000.0, 850.0)}))
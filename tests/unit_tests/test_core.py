@@ -3,7 +3,7 @@ from unittest import TestCase
 
 from hamcrest import assert_that
 
-from pdp8.core import PDP8, octal
+from pdp8.core import PDP8, octal, HALTED, BUDGET_EXHAUSTED, TIMED_OUT
 from pdp8.pal import Pal
 from pdp8.tracing import HaltTracer
 from tests.helpers.checker import PDPChecker
@@ -57,14 +57,14 @@ class MriTest(AbstractCodeTest):
 
     def test_isz_with_skip(self):
         self.pdp.memory[0] = self.instruction('ISZ 2')
-        self.pdp.memory[2] = -1
+        self.pdp[2] = -1
         self.pdp.run(stepping=True)
         self.check(memory={2:0},pc=2)
 
     def test_dca(self):
         self.pdp.accumulator = 1
         self.pdp.memory[0] = self.instruction('DCA 2')
-        self.pdp.memory[2] = -1
+        self.pdp[2] = -1
         self.pdp.run(stepping=True)
         self.check(memory={2:1}, pc=1, accumulator=0)
 
@@ -362,27 +362,133 @@ class OprGroup2Test(AbstractCodeTest):
         self.check(pc=2)
 
 
+class DecodedCacheTest(AbstractCodeTest):
+    def test_store_invalidates_decoded_instruction(self):
+        self.pdp.memory[0] = self.instruction('TAD 2')
+        self.pdp.memory[2] = 1
+        self.pdp.run(stepping=True)
+        self.pdp[0] = self.instruction('AND 2')
+        self.pdp.pc = 0
+        self.pdp.run(stepping=True)
+        self.check(accumulator=1)
+        assert_that(0 in self.pdp.decoded, 'decoded cache should hold the new instruction')
 
+    def test_direct_memory_change_is_redecoded(self):
+        self.pdp.accumulator = 3
+        self.pdp.memory[0] = self.instruction('TAD 2')
+        self.pdp.memory[2] = 1
+        self.pdp.run(stepping=True)
+        self.pdp.memory[0] = self.instruction('DCA 2')
+        self.pdp.pc = 0
+        self.pdp.run(stepping=True)
+        self.check(memory={2: 4}, accumulator=0)
+
+
+class RunFastTest(AbstractCodeTest):
+    def test_budget_stops_run(self):
+        self.pdp.memory[0] = self.instruction('JMP 0')
+        executed = self.pdp.run_fast(max_instructions=10)
+        assert_that(executed == 10, 'expected 10 instructions but executed %d' % executed)
+        assert_that(not self.pdp.running, 'PDP8 should have stopped')
+        self.check(pc=0)
+
+    def test_matches_stepping(self):
+        program = ['CLA CLL', 'TAD 10', 'ISZ 11', 'JMP 1', 'DCA 12', 'HLT']
+        for (location, text) in enumerate(program):
+            self.pdp.memory[location] = self.instruction(text, location)
+        self.pdp.memory[octal('10')] = 5
+        self.pdp.memory[octal('11')] = octal('7775')
+        stepped = PDP8()
+        stepped.memory = self.pdp.memory[:]
+        stepped.tracer = HaltTracer()
+        while not stepped.tracer.halted:
+            stepped.run(stepping=True)
+        self.pdp.run()
+        assert_that(self.pdp.memory == stepped.memory, 'memory should match stepped run')
+        self.check(memory={octal('12'): 15}, pc=stepped.pc, accumulator=stepped.accumulator, link=stepped.link)
+
+
+class MemoryTest(AbstractCodeTest):
+    def test_store_keeps_12_bits(self):
+        self.pdp[5] = octal('17777')
+        self.check(memory={5: octal('7777')})
+
+    def test_memory_is_a_compact_buffer(self):
+        assert_that(self.pdp.memory.itemsize == 2, 'memory should hold 16-bit cells')
+        assert_that(len(bytes(self.pdp.memory)) == 2 * 4096, 'core image should copy as one buffer')
+
+    def test_image_larger_than_memory_is_rejected(self):
+        for fields in (1, 2):
+            pdp = PDP8(fields)
+            with self.assertRaises(ValueError):
+                pdp.memory = [1] * (fields * 4096 + 1)
+            assert_that(len(pdp.memory) == fields * 4096, 'memory should keep its size')
+
+
+class MemoryExtensionTest(AbstractCodeTest):
+    def setUp(self):
+        self.pdp = PDP8(fields=2)
+        self.checker = PDPChecker(self.pdp)
+        self.pal = Pal(self.pdp)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def load(self, base, *program):
+        for (offset, text) in enumerate(program):
+            self.pdp[base + offset] = self.instruction(text, offset)
+
+    def test_cdf_selects_field_for_indirect_operands(self):
+        self.load(0, 'CLA', 'TAD 7', 'CDF 10', 'DCA I 6', 'TAD I 6', 'HLT', '100', '5')
+        self.pdp.run()
+        self.check(memory={octal('10100'): 5, octal('100'): 0}, accumulator=5)
+
+    def test_cif_takes_effect_at_next_jump(self):
+        self.load(0, 'CIF 10', 'IAC', 'JMP 20')
+        self.load(octal('10020'), 'RIF', 'HLT')
+        self.pdp.run()
+        self.check(accumulator=octal('11'), pc=octal('22'))
+        assert_that(self.pdp.instruction_field == 1, 'expected to be running in field 1')
+
+    def test_jms_stores_return_address_in_new_field(self):
+        self.load(0, 'CIF 10', 'JMS 20', 'HLT')
+        self.load(octal('10020'), '0', 'CIF 0', 'JMP I 20')
+        self.pdp.run(translate=True)
+        self.check(memory={octal('10020'): 2, octal('20'): 0}, pc=3)
+
+    def test_rdf_reads_data_field(self):
+        self.load(0, 'CDF 10', 'RDF', 'HLT')
+        self.pdp.run()
+        self.check(accumulator=octal('10'))
+
+    def test_nonexistent_field(self):
+        self.load(0, 'CDF 20')
+        with self.assertRaises(ValueError):
+            self.pdp.run()
+
+
+class RunResultTest(AbstractCodeTest):
+    def test_halted_run_counts_cycles(self):
+        self.pdp.memory[0] = self.instruction('TAD I 3')
+        self.pdp.memory[1] = self.instruction('JMP 2')
+        self.pdp.memory[2] = self.instruction('HLT')
+        self.pdp.memory[3] = 4
+        result = self.pdp.run()
+        assert_that(result.status == HALTED, 'expected a halt but got %s' % result.status)
+        assert_that(result.instructions == 3, 'expected 3 instructions but got %d' % result.instructions)
+        assert_that(result.cycles == 5, 'expected 5 cycles but got %d' % result.cycles)
+
+    def test_budget_exhausted(self):
+        self.pdp.memory[0] = self.instruction('JMP 0')
+        result = self.pdp.run(max_instructions=25, translate=True)
+        assert_that(result.status == BUDGET_EXHAUSTED, 'expected budget exhaustion but got %s' % result.status)
+        assert_that(result.instructions == 25, 'expected 25 instructions but got %d' % result.instructions)
+
+    def test_empty_budget_executes_nothing(self):
+        self.pdp.memory[0] = self.instruction('IAC')
+        for mode in [dict(), dict(translate=True), dict(debugging=True), dict(stepping=True)]:
+            result = self.pdp.run(max_instructions=0, **mode)
+            assert_that(result.instructions == 0, 'expected no instructions but got %d' % result.instructions)
+        self.check(pc=0, accumulator=0)
+
+    def test_timeout(self):
+        self.pdp.memory[0] = self.instruction('JMP 0')
+        result = self.pdp.run(timeout=0.01)
+        assert_that(result.status == TIMED_OUT, 'expected a timeout but got %s' % result.status)
@@ -0,0 +1,329 @@
+import mmap
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, calling, raises
+
+from pdp8.core import PDP8, octal
+from pdp8.devices import Device, Reader, Punch, Clock, CLOCK
+from pdp8.pal import Pal
+from pdp8.tracing import NullTracer
+
+KSF = 1
+KCC = 2
+KRS = 4
+KRB = 6
+TLS = 6
+
+
+class ReaderTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+
+    def read_all(self, reader):
+        characters = []
+        while reader.flag:
+            self.pdp.accumulator = 0o7777
+            reader.iot(self.pdp, KRB)
+            characters.append(self.pdp.accumulator)
+        return bytes(characters)
+
+    def test_first_character_is_ready(self):
+        reader = Reader(b'AB')
+        assert_that(reader.flag, equal_to(1))
+        self.pdp.pc = 0o200
+        reader.iot(self.pdp, KSF)
+        assert_that(self.pdp.pc, equal_to(0o201))
+
+    def test_krs_ors_without_advancing(self):
+        reader = Reader(b'A')
+        self.pdp.accumulator = 0o200
+        reader.iot(self.pdp, KRS)
+        reader.iot(self.pdp, KRS)
+        assert_that(self.pdp.accumulator, equal_to(0o200 | ord('A')))
+        assert_that(reader.flag, equal_to(1))
+
+    def test_kcc_clears_and_advances(self):
+        reader = Reader(b'AB')
+        self.pdp.accumulator = 0o1234
+        reader.iot(self.pdp, KCC)
+        assert_that(self.pdp.accumulator, equal_to(0))
+        assert_that(reader.buffer, equal_to(ord('B')))
+
+    def test_flag_stays_clear_at_end_of_tape(self):
+        reader = Reader(b'A')
+        reader.iot(self.pdp, KRB)
+        self.pdp.pc = 0o200
+        reader.iot(self.pdp, KSF)
+        assert_that(reader.flag, equal_to(0))
+        assert_that(self.pdp.pc, equal_to(0o200))
+
+    def test_empty_tape(self):
+        assert_that(Reader(b'').flag, equal_to(0))
+
+    def test_text_tape(self):
+        assert_that(self.read_all(Reader('HELLO')), equal_to(b'HELLO'))
+
+    def test_file_is_read_in_chunks(self):
+        tape = bytes(range(256)) * 10
+        assert_that(self.read_all(Reader(BytesIO(tape), chunk_size=7)), equal_to(tape))
+
+    def test_source_of_a_file_tape(self):
+        tape = BytesIO(b'ABCDEFGH')
+        reader = Reader(tape, chunk_size=3)
+        for _ in range(4):
+            reader.iot(self.pdp, KRB)
+        assert_that(reader.source(), equal_to((b'ABCDEFGH', 5)))
+        assert_that(reader.file, equal_to(tape))
+        assert_that(self.read_all(reader), equal_to(b'EFGH'))
+
+    def test_memory_mapped_tape(self):
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'tape.bin')
+        with open(filename, 'wb') as f:
+            f.write(b'MAPPED')
+        with open(filename, 'rb') as f:
+            tape = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        assert_that(self.read_all(Reader(tape)), equal_to(b'MAPPED'))
+        tape.close()
+        os.remove(filename)
+        os.rmdir(directory)
+
+
+class PunchTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+
+    def punch(self, punch, text):
+        for character in text:
+            self.pdp.accumulator = ord(character)
+            punch.iot(self.pdp, TLS)
+
+    def test_text_is_kept_without_a_sink(self):
+        punch = Punch(threshold=2)
+        self.punch(punch, 'HELLO')
+        assert_that(punch.text(), equal_to('HELLO'))
+        assert_that(punch.flag, equal_to(1))
+
+    def test_blocks_are_written_at_the_threshold(self):
+        blocks = []
+        punch = Punch(blocks.append, threshold=2)
+        self.punch(punch, 'HELLO')
+        assert_that(blocks, equal_to([b'HE', b'LL']))
+        punch.flush()
+        assert_that(blocks, equal_to([b'HE', b'LL', b'O']))
+        assert_that(punch.text(), equal_to(''))
+
+    def test_bytearray_sink(self):
+        sink = bytearray()
+        punch = Punch(sink)
+        self.punch(punch, 'HELLO')
+        punch.flush()
+        assert_that(sink, equal_to(bytearray(b'HELLO')))
+
+    def test_run_flushes_to_a_file(self):
+        sink = BytesIO()
+        self.pdp.tape_punch.connect(sink)
+        Pal(self.pdp).assemble(StringIO(open('data/hello.pal').read()))
+        self.pdp.run(start=octal('200'))
+        assert_that(sink.getvalue(), equal_to(b'HELLO, WORLD!\r\n'))
+        assert_that(self.pdp.output, equal_to(''))
+
+
+class Counter(Device):
+    def __init__(self):
+        self.count = 0
+
+    def iot(self, pdp8, io_op):
+        self.count += io_op
+        pdp8.accumulator = self.count
+
+    def reset(self):
+        self.count = 0
+
+
+class DeviceBusTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+
+    def run_iot(self, instruction):
+        self.pdp.memory = [instruction, octal('7402')]
+        self.pdp.pc = 0
+        self.pdp.run()
+
+    def test_attached_device_handles_its_code(self):
+        counter = Counter()
+        self.pdp.attach(octal('13'), counter)
+        self.run_iot(octal('6135'))
+        assert_that(counter.count, equal_to(5))
+        assert_that(self.pdp.accumulator, equal_to(5))
+
+    def test_reset_resets_devices(self):
+        counter = Counter()
+        self.pdp.attach(octal('13'), counter)
+        self.run_iot(octal('6131'))
+        self.pdp.reset()
+        assert_that(counter.count, equal_to(0))
+
+    def test_unknown_device(self):
+        assert_that(calling(self.run_iot).with_args(octal('6135')), raises(ValueError))
+
+    def test_detached_device_is_unknown(self):
+        self.pdp.detach(self.pdp.PUNCH1)
+        assert_that(calling(self.run_iot).with_args(octal('6046')), raises(ValueError))
+
+
+CLOCK_PROGRAM = """
+*0
+        0
+        JMP I 2
+        TICK
+*20
+SAVE,   0
+COUNT,  0
+M5,     7773
+*200
+START,  CLEI
+        ION
+LOOP,   TAD COUNT
+        TAD M5
+        SZA CLA
+        JMP LOOP
+        HLT
+TICK,   DCA SAVE
+        CLSK
+        JMP BACK
+        ISZ COUNT
+BACK,   TAD SAVE
+        ION
+        JMP I 0
+"""
+
+
+class InterruptTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+
+    def run_iot(self, instruction):
+        self.pdp.memory = [instruction, octal('7402'), octal('7402')]
+        self.pdp.pc = 0
+        self.pdp.run()
+
+    def test_interrupt_driven_output(self):
+        for mode in [dict(), dict(translate=True), dict(debugging=True)]:
+            self.pdp.reset()
+            self.pal.assemble(StringIO(open('data/interrupt.pal').read()))
+            self.pdp.run(start=octal('200'), **mode)
+            assert_that(self.pdp.output, equal_to('HELLO'))
+            assert_that(self.pdp.interrupt_enable, equal_to(True))
+
+    def test_clock_interrupts(self):
+        self.pdp.attach(CLOCK, Clock(1000))
+        self.pal.assemble(CLOCK_PROGRAM.splitlines())
+        self.pdp.run(start=octal('200'))
+        assert_that(self.pdp[octal('21')], equal_to(5))
+        assert_that(5000 <= self.pdp.cycles < 5100, equal_to(True))
+
+    def test_interrupts_wait_for_the_instruction_after_ion(self):
+        self.pdp.tape_punch.flag = 1
+        self.pdp.memory = [0, octal('7402'), 0, 0, octal('6001'), octal('7001'), octal('7001')]
+        self.pdp.pc = 4
+        self.pdp.run()
+        assert_that(self.pdp.pc, equal_to(2))
+        assert_that(self.pdp[0], equal_to(6))
+        assert_that(self.pdp.accumulator, equal_to(1))
+        assert_that(self.pdp.interrupt_enable, equal_to(False))
+
+    def test_interrupt_saves_fields(self):
+        pdp = PDP8(fields=2)
+        pdp.tape_punch.flag = 1
+        pdp.memory = [0, octal('7402')] + (octal('10000') - 2) * [0] + [octal('6211'), octal('6001'), octal('7000')]
+        pdp.instruction_field = 1
+        pdp.select_fields()
+        pdp.run(max_instructions=4)
+        assert_that(pdp.save_field, equal_to(octal('11')))
+        assert_that(pdp.instruction_field, equal_to(0))
+        assert_that(pdp[0], equal_to(3))
+
+    def test_interrupt_after_a_field_transfer(self):
+        results = []
+        for mode in [dict(), dict(translate=True), dict(debugging=True, tracer=NullTracer())]:
+            pdp = PDP8(fields=2)
+            pdp.tape_punch.flag = 1
+            Pal(pdp).assemble(['*0', '0', 'HLT', '*200', 'ION', 'CIF 0', 'IAC', 'JMP LOOP', 'LOOP, JMP LOOP'])
+            result = pdp.run(start=octal('200'), max_instructions=1000, **mode)
+            results.append((result, pdp.pc, pdp[0], pdp.accumulator))
+        assert_that(results[0][0].instructions, equal_to(5))
+        assert_that(results[0], equal_to(results[2]))
+        assert_that(results[1], equal_to(results[2]))
+
+    def test_skon(self):
+        self.pdp.interrupt_enable = True
+        self.pdp.interrupt_delay = True
+        self.run_iot(octal('6000'))
+        assert_that(self.pdp.pc, equal_to(3))
+        assert_that(self.pdp.interrupt_enable, equal_to(False))
+
+    def test_srq(self):
+        self.run_iot(octal('6003'))
+        assert_that(self.pdp.pc, equal_to(2))
+        self.pdp.tape_punch.flag = 1
+        self.run_iot(octal('6003'))
+        assert_that(self.pdp.pc, equal_to(3))
+
+    def test_gtf_and_rtf(self):
+        self.pdp.link = 1
+        self.pdp.save_field = octal('0')
+        self.pdp.tape_punch.flag = 1
+        self.run_iot(octal('6004'))
+        assert_that(self.pdp.accumulator, equal_to(octal('5000')))
+        self.pdp.accumulator = 0
+        self.run_iot(octal('6005'))
+        assert_that(self.pdp.link, equal_to(0))
+        assert_that(self.pdp.interrupt_enable, equal_to(True))
+
+
+class IdleLoopTest(TestCase):
+    def run_hello(self, **kwargs):
+        pdp = PDP8()
+        pdp.tape_punch.latency = 1000
+        Pal(pdp).assemble(StringIO(open('data/hello.pal').read()))
+        result = pdp.run(start=octal('200'), **kwargs)
+        return pdp, result
+
+    def test_wait_loops_are_skipped_over(self):
+        pdp, result = self.run_hello()
+        assert_that(pdp.output, equal_to('HELLO, WORLD!\r\n'))
+        assert_that(pdp.idle_instructions > 14000, equal_to(True))
+
+    def test_skipping_changes_no_results(self):
+        for budget in [None, 100, 1001, 5000]:
+            fast, fast_result = self.run_hello(max_instructions=budget)
+            translated, translated_result = self.run_hello(max_instructions=budget, translate=True)
+            stepped, stepped_result = self.run_hello(max_instructions=budget, debugging=True, tracer=NullTracer())
+            assert_that(stepped.idle_instructions, equal_to(0))
+            assert_that(fast_result, equal_to(stepped_result))
+            assert_that(translated_result, equal_to(stepped_result))
+            for pdp in (fast, translated):
+                assert_that((pdp.pc, pdp.accumulator, pdp.output), equal_to((stepped.pc, stepped.accumulator, stepped.output)))
+
+    def test_reader_latency(self):
+        pdp = PDP8()
+        pdp.tape_reader.latency = 300
+        Pal(pdp).assemble(StringIO(open('data/copy.pal').read()))
+        result = pdp.run(start=octal('200'), tape='HELLO.')
+        assert_that(pdp.output, equal_to('HELLO'))
+        assert_that(result.cycles > 5 * 300, equal_to(True))
+        assert_that(pdp.idle_instructions > 0, equal_to(True))
+
+    def test_clock_wait_loop(self):
+        pdp = PDP8()
+        pdp.attach(CLOCK, Clock(1000))
+        pdp.memory = [octal('6133'), octal('5000'), octal('7402')]
+        pdp.pc = 0
+        result = pdp.run()
+        assert_that(result.cycles, equal_to(1002))
+        assert_that(pdp.idle_instructions, equal_to(998))
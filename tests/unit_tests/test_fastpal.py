@@ -0,0 +1,55 @@
+import glob
+import os
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.fastpal import FastPal
+from pdp8.pal import Pal
+from tests.helpers.files import read
+
+
+class FastPalTest(TestCase):
+    def test_matches_pal_for_sample_programs(self):
+        for filename in map(os.path.basename, glob.glob(os.path.join('data', '*.pal'))):
+            pal = Pal(PDP8())
+            pal.assemble(StringIO(read(filename)))
+            fast = FastPal(PDP8())
+            fast.assemble(StringIO(read(filename)))
+            assert_that(fast.planter.code, equal_to(pal.planter.code), filename)
+            assert_that(fast.planter.symbols, equal_to(pal.planter.symbols), filename)
+            assert_that(fast.planter.source, equal_to(pal.planter.source), filename)
+
+    def test_matches_pal_for_single_instructions(self):
+        pal = Pal(PDP8())
+        fast = FastPal(PDP8())
+        for (text, location) in [('AND I Z 202', octal('200')), ('DCA 202', octal('200')), ('TAD I 2', 0),
+                                 ('CLA CLL', 0), ('SZA CLA', 0), ('RAL IAC CLA CMA', 0), ('TSF', 0),
+                                 ('KRB', 0), ('CDF CIF 30', 0), ('RMF', 0), ('JMP .-1', 5), ('7777', 0)]:
+            assert_that(fast.instruction(text, location), equal_to(pal.instruction(text, location)), text)
+
+    def test_forward_references_are_patched(self):
+        source = ['*200', 'TAD I PTR', 'JMP LATER', 'PTR, DATA', 'LATER, HLT', 'DATA, 42', '$']
+        fast = FastPal(PDP8())
+        fast.assemble(source)
+        pal = Pal(PDP8())
+        pal.assemble(StringIO('\n'.join(source)))
+        assert_that(fast.planter.code[octal('200'):octal('205')], equal_to(pal.planter.code[octal('200'):octal('205')]))
+        assert_that(fast.planter.code[octal('201')], equal_to(octal('5003')))
+
+    def test_undefined_symbol(self):
+        with self.assertRaises(KeyError):
+            FastPal(PDP8()).assemble(['TAD NOWHERE'])
+
+    def test_unrecognised_line(self):
+        with self.assertRaises(ValueError):
+            FastPal(PDP8()).assemble(['CLA SZA IAC'])
+
+    def test_assembles_from_a_generator(self):
+        fast = FastPal(PDP8())
+        fast.assemble(line for line in read('mult.pal').splitlines())
+        pal = Pal(PDP8())
+        pal.assemble(StringIO(read('mult.pal')))
+        assert_that(fast.planter.code, equal_to(pal.planter.code))
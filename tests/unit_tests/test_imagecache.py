@@ -0,0 +1,80 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.fastpal import FastPal
+from pdp8 import imagecache
+from pdp8.imagecache import ImageCache
+from pdp8.pal import Pal
+from tests.helpers.files import read
+
+
+class ImageCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ImageCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cached_image_matches_assembled_image(self):
+        first = Pal(PDP8(), self.cache)
+        first.assemble(StringIO(read('mul-sub.pal')))
+        assert_that(len(os.listdir(self.directory.name)), equal_to(1))
+        second = Pal(PDP8(), self.cache)
+        second.pass2 = None  # assembling would now fail
+        second.assemble(StringIO(read('mul-sub.pal')))
+        assert_that(second.planter.code, equal_to(first.planter.code))
+        assert_that(second.planter.symbols, equal_to(first.planter.symbols))
+        assert_that(second.planter.source, equal_to(first.planter.source))
+
+    def test_cached_image_runs(self):
+        Pal(PDP8(), self.cache).assemble(StringIO(read('hello.pal')))
+        pdp = PDP8()
+        Pal(pdp, self.cache).assemble(StringIO(read('hello.pal')))
+        pdp.run(start=octal('200'))
+        assert_that(pdp.output, equal_to('HELLO, WORLD!\r\n'))
+
+    def test_changed_source_is_reassembled(self):
+        pal = Pal(PDP8(), self.cache)
+        pal.assemble(['*200', 'CLA', 'HLT'])
+        pal.assemble(['*200', 'CLA', 'IAC', 'HLT'])
+        assert_that(pal.planter.code[octal('201')], equal_to(octal('7001')))
+        assert_that(len(os.listdir(self.directory.name)), equal_to(2))
+
+    def test_assemblers_have_separate_entries(self):
+        Pal(PDP8(), self.cache).assemble(StringIO(read('mult.pal')))
+        fast = FastPal(PDP8(), self.cache)
+        fast.assemble(StringIO(read('mult.pal')))
+        assert_that(len(os.listdir(self.directory.name)), equal_to(2))
+        again = FastPal(PDP8(), self.cache)
+        again.assemble(StringIO(read('mult.pal')))
+        assert_that(again.planter.code, equal_to(fast.planter.code))
+
+    def test_damaged_entries_are_reassembled(self):
+        source = StringIO(read('mult.pal')).readlines()
+        pal = Pal(PDP8(), self.cache)
+        pal.assemble(source)
+        code = pal.planter.code
+        filename = os.path.join(self.directory.name, os.listdir(self.directory.name)[0])
+        with open(filename, 'rb') as f:
+            entry = f.read()
+        for damaged in [entry[:5], entry[:-10], entry[:-10] + b'\xff' * 10]:
+            with open(filename, 'wb') as f:
+                f.write(damaged)
+            again = Pal(PDP8(), self.cache)
+            again.assemble(source)
+            assert_that(again.planter.code, equal_to(code))
+
+    def test_changed_tables_miss_old_entries(self):
+        statements = ['*200', 'CLA', 'HLT']
+        key = self.cache.key('Pal', statements)
+        with patch.object(imagecache, 'TABLES', imagecache.TABLES + 'changed'):
+            assert_that(self.cache.key('Pal', statements) == key, equal_to(False))
+        with patch.object(imagecache, 'ASSEMBLERS', imagecache.ASSEMBLERS + 1):
+            assert_that(self.cache.key('Pal', statements) == key, equal_to(False))
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import CLA1, CLL, CMA, CML, IAC, RAR, RAL, BIT8
+from pdp8.microcode import GROUP1, SKIPS, skip_state
+
+SAMPLES = [0, 1, 0o0777, 0o2525, 0o4000, 0o5252, 0o7776, 0o7777]
+
+
+def rotate_right(ac, link, times):
+    for _ in range(times):
+        ac, link = (ac >> 1) | (link << 11), ac & 1
+    return ac, link
+
+
+def rotate_left(ac, link, times):
+    for _ in range(times):
+        ac, link = (ac << 1) & 0o7777 | link, ac >> 11
+    return ac, link
+
+
+# The micro-operations of group 1 applied one at a time, in sequence.
+def group1_one_at_a_time(instruction, ac, link):
+    if instruction & CLA1:
+        ac = 0
+    if instruction & CLL:
+        link = 0
+    if instruction & CMA:
+        ac ^= 0o7777
+    if instruction & CML:
+        link = 1 - link
+    if instruction & IAC:
+        link = 1 if ac == 0o7777 else 0
+        ac = (ac + 1) & 0o7777
+    times = 2 if instruction & 0o0002 else 1
+    if instruction & RAR:
+        ac, link = rotate_right(ac, link, times)
+    if instruction & RAL:
+        ac, link = rotate_left(ac, link, times)
+    return ac, link
+
+
+def group2_skips(instruction, ac, link):
+    sma = ac & 0o4000 and instruction & 0o0100
+    sza = ac == 0 and instruction & 0o0040
+    snl = link == 1 and instruction & 0o0020
+    if instruction & BIT8:  # SPA, SNA and SZL skip only if none of the conditions hold
+        return not (sma or sza or snl)
+    return bool(sma or sza or snl)
+
+
+# The tables are checked against the micro-operations applied one at a time.
+class MicrocodeTest(TestCase):
+    def test_group1_table(self):
+        for bits in range(0o400):
+            for ac in SAMPLES:
+                for link in (0, 1):
+                    assert_that(GROUP1[bits](ac, link), equal_to(group1_one_at_a_time(0o7000 | bits, ac, link)))
+
+    def test_group2_table(self):
+        for bits in range(16):
+            instruction = 0o7400 | (bits << 3)
+            for ac in SAMPLES:
+                for link in (0, 1):
+                    skip = bool(SKIPS[bits] >> skip_state(ac, link) & 1)
+                    assert_that(skip, equal_to(group2_skips(instruction, ac, link)))
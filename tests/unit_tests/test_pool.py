@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.pool import Job, JobPool
+from tests.helpers.files import read
+
+
+def assemble(filename):
+    pal = Pal(PDP8())
+    pal.assemble(StringIO(read(filename)))
+    return pal.planter.code
+
+
+class JobPoolTest(TestCase):
+    def test_runs_jobs_in_order(self):
+        jobs = [Job(assemble('mult.pal'), octal('200')),
+                Job(assemble('hello.pal'), octal('200')),
+                Job(assemble('mult.pal'), octal('200'), budget=10)]
+        with JobPool(workers=2) as pool:
+            results = list(pool.run(jobs))
+        assert_that(results[0].accumulator, equal_to(648))
+        assert_that(results[0].halted)
+        assert_that(results[1].output, equal_to('HELLO, WORLD!\r\n'))
+        assert_that(results[2].executed, equal_to(10))
+        assert_that(not results[2].halted, 'budget should stop the job before HLT')
+
+    def test_workers_reuse_clean_machines(self):
+        image = assemble('hello.pal')
+        with JobPool(workers=1) as pool:
+            results = list(pool.run(3 * [Job(image, octal('200'))]))
+        assert_that([result.output for result in results], equal_to(3 * ['HELLO, WORLD!\r\n']))
+
+    def test_jobs_are_taken_as_they_are_needed(self):
+        image = assemble('mult.pal')
+        taken = []
+
+        def jobs():
+            for n in range(20):
+                taken.append(n)
+                yield Job(image, octal('200'))
+        with JobPool(workers=2) as pool:
+            results = pool.run(jobs())
+            next(results)
+            assert_that(len(taken), equal_to(4))
+            assert_that(len(list(results)), equal_to(19))
+        assert_that(len(taken), equal_to(20))
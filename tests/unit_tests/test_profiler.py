@@ -0,0 +1,51 @@
+import contextlib
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.profiler import Profiler
+from tests.helpers.files import read
+
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        self.pal.assemble(StringIO(read('mul-sub.pal')))
+        self.profiler = Profiler(self.pal.planter.symbols)
+
+    def profile(self):
+        with contextlib.redirect_stdout(StringIO()):
+            return self.profiler.run(self.pdp, start=octal('200'))
+
+    def test_counts_every_instruction(self):
+        result = self.profile()
+        assert_that(sum(self.profiler.counts), equal_to(result.instructions))
+        assert_that(self.profiler.counts[octal('6004')], equal_to(3))
+        assert_that(self.profiler.by_label()['MULT'], equal_to(12))
+
+    def test_labels(self):
+        assert_that(self.profiler.label(octal('6000')), equal_to('MULT'))
+        assert_that(self.profiler.label(octal('6005')), equal_to('MULT+5'))
+        assert_that(self.profiler.label(octal('100')), equal_to('0100'))
+
+    def test_report_is_sorted(self):
+        self.profile()
+        report = self.profiler.report()
+        assert_that(report[1].split()[-1], equal_to('MULT'))
+        assert_that(report[1].split()[0], equal_to('12'))
+
+    def test_folded_stacks_follow_calls(self):
+        self.profile()
+        assert_that(self.profiler.folded(), equal_to(['START 7', 'START;MULT 12']))
+
+    def test_sampling(self):
+        profiler = Profiler(self.pal.planter.symbols, sample_every=4)
+        result = profiler.run(self.pdp, start=octal('200'))
+        assert_that(self.pdp[octal('210')], equal_to(6))
+        assert_that(result.instructions, equal_to(19))
+        assert_that(sum(profiler.counts), equal_to(5))
+        assert_that(profiler.folded(), equal_to([]))
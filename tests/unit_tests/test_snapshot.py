@@ -0,0 +1,132 @@
+import os
+import tempfile
+from array import array
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.devices import Clock, CLOCK
+from pdp8.pal import Pal
+from pdp8.snapshot import Snapshot, pack_words, unpack_words
+from tests.helpers.files import read
+from tests.unit_tests.test_devices import CLOCK_PROGRAM
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        self.pal.assemble(StringIO(read('hello.pal')))
+
+    def test_words_pack_into_three_bytes_per_pair(self):
+        words = array('H', [octal('7777'), 0, octal('1234'), octal('4321')])
+        packed = pack_words(words)
+        assert_that(len(packed), equal_to(6))
+        assert_that(unpack_words(packed, 4), equal_to(words))
+
+    def test_restored_machine_continues_identically(self):
+        self.pdp.run(start=octal('200'), max_instructions=50)
+        snapshot = self.pdp.snapshot()
+        self.pdp.run(tape=None)
+        forked = PDP8()
+        forked.restore(snapshot)
+        forked.run(tape=None)
+        assert_that(forked.output, equal_to('HELLO, WORLD!\r\n'))
+        assert_that(forked.memory, equal_to(self.pdp.memory))
+        assert_that(forked.cycles, equal_to(self.pdp.cycles))
+
+    def test_snapshot_file_is_memory_mapped(self):
+        self.pdp.run(start=octal('200'), max_instructions=50)
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'hello.snap')
+        self.pdp.snapshot().save(filename)
+        snapshot = Snapshot.load(filename)
+        for _ in range(2):
+            forked = PDP8()
+            forked.restore(snapshot)
+            forked.run(tape=None)
+            assert_that(forked.output, equal_to('HELLO, WORLD!\r\n'))
+        snapshot.data.close()
+        os.remove(filename)
+        os.rmdir(directory)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            Snapshot(b'NOT A SNAPSHOT AT ALL, JUST SOME BYTES FOR THE HEADER')
+
+    def test_restores_the_tape_reader(self):
+        pal = Pal(self.pdp)
+        pal.assemble(StringIO(read('copy.pal')))
+        self.pdp.run(start=octal('200'), tape='ABCDEF.', max_instructions=30)
+        snapshot = self.pdp.snapshot()
+        self.pdp.run(tape=None)
+        forked = PDP8()
+        forked.restore(snapshot)
+        forked.run(tape=None)
+        assert_that(forked.output, equal_to('ABCDEF'))
+        assert_that(forked.output, equal_to(self.pdp.output))
+
+    def test_restores_device_timing(self):
+        self.pdp.tape_punch.latency = 1000
+        self.pdp.run(start=octal('200'), max_instructions=1001)
+        snapshot = self.pdp.snapshot()
+        result = self.pdp.run(tape=None)
+        forked = PDP8()
+        forked.tape_punch.latency = 1000
+        forked.restore(snapshot)
+        assert_that(forked.run(tape=None), equal_to(result))
+        assert_that(forked.output, equal_to('HELLO, WORLD!\r\n'))
+
+    def test_restores_the_clock(self):
+        self.pdp.attach(CLOCK, Clock(100))
+        self.pal.assemble(CLOCK_PROGRAM.splitlines())
+        self.pdp.run(start=octal('200'), max_instructions=150)
+        snapshot = self.pdp.snapshot()
+        result = self.pdp.run(tape=None)
+        forked = PDP8()
+        forked.attach(CLOCK, Clock(100))
+        forked.restore(snapshot)
+        assert_that(forked.run(tape=None), equal_to(result))
+        assert_that((forked.memory, forked.pc), equal_to((self.pdp.memory, self.pdp.pc)))
+
+    def test_rejects_a_device_that_is_not_attached(self):
+        self.pdp.attach(CLOCK, Clock(100))
+        snapshot = self.pdp.snapshot()
+        with self.assertRaises(ValueError):
+            PDP8().restore(snapshot)
+
+    def test_tape_is_not_copied(self):
+        pal = Pal(self.pdp)
+        pal.assemble(StringIO(read('copy.pal')))
+        tape = BytesIO(b'A' * 1000000 + b'.')
+        self.pdp.run(start=octal('200'), tape=tape, max_instructions=30)
+        snapshot = self.pdp.snapshot()
+        assert_that(len(snapshot.data) < 10000, equal_to(True))
+        assert_that(self.pdp.tape_reader.file, equal_to(tape))
+        forked = PDP8()
+        forked.restore(snapshot)
+        forked.run(tape=None, max_instructions=300)
+        self.pdp.run(tape=None, max_instructions=300)
+        assert_that(forked.output, equal_to(self.pdp.output))
+
+    def test_saved_snapshot_reopens_a_tape_file(self):
+        Pal(self.pdp).assemble(StringIO(read('copy.pal')))
+        directory = tempfile.mkdtemp()
+        filename = os.path.join(directory, 'tape.txt')
+        with open(filename, 'wb') as f:
+            f.write(b'ABCDEF.')
+        with open(filename, 'rb') as tape:
+            self.pdp.run(start=octal('200'), tape=tape, max_instructions=30)
+            self.pdp.snapshot().save(filename + '.snap')
+        snapshot = Snapshot.load(filename + '.snap')
+        forked = PDP8()
+        forked.restore(snapshot)
+        forked.run(tape=None)
+        assert_that(forked.output, equal_to('ABCDEF'))
+        snapshot.data.close()
+        snapshot.tape.close()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
@@ -0,0 +1,60 @@
+from array import array
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, calling, raises
+
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.tape import segments, punch_bin, read_bin, punch_rim, read_rim, load_bin, load_rim, LEADER
+from tests.helpers.files import read
+
+
+class TapeTest(TestCase):
+    def setUp(self):
+        self.pal = Pal(PDP8())
+        self.pal.assemble(StringIO(read('hello.pal')))
+        self.segments = segments(self.pal.planter.code, self.pal.planter.source)
+
+    def test_segments_are_runs_of_addresses(self):
+        image = array('H', range(10))
+        assert_that(segments(image, [5, 1, 2, 3, 8]),
+                    equal_to([(1, array('H', [1, 2, 3])), (5, array('H', [5])), (8, array('H', [8]))]))
+
+    def test_bin_tape_round_trip(self):
+        assert_that(read_bin(punch_bin(self.segments)), equal_to(self.segments))
+
+    def test_bin_tape_format(self):
+        tape = punch_bin([(octal('200'), array('H', [octal('7300'), octal('1234')]))], leader_length=2)
+        assert_that(list(tape), equal_to([LEADER, LEADER,
+                                          octal('102'), octal('00'),
+                                          octal('73'), octal('00'),
+                                          octal('12'), octal('34'),
+                                          octal('02'), octal('43'),  # checksum 0o0243
+                                          LEADER, LEADER]))
+
+    def test_bin_tape_checksum_is_checked(self):
+        tape = bytearray(punch_bin(self.segments))
+        tape[70] ^= 1
+        assert_that(calling(read_bin).with_args(bytes(tape)), raises(ValueError))
+
+    def test_bin_tape_sets_fields(self):
+        loaded = [(octal('10200'), array('H', [1, 2, 3])), (octal('200'), array('H', [4]))]
+        assert_that(read_bin(punch_bin(loaded)), equal_to(loaded))
+
+    def test_rim_tape_round_trip(self):
+        assert_that(read_rim(punch_rim(self.segments)), equal_to(self.segments))
+
+    def test_malformed_rim_tape(self):
+        assert_that(calling(read_rim).with_args(bytes([LEADER, octal('100'), 1, 2, LEADER])), raises(ValueError))
+
+    def test_loaded_bin_tape_runs(self):
+        pdp = PDP8()
+        load_bin(pdp, punch_bin(self.segments))
+        pdp.run(start=octal('200'))
+        assert_that(pdp.output, equal_to('HELLO, WORLD!\r\n'))
+
+    def test_loaded_rim_tape_runs(self):
+        pdp = PDP8()
+        load_rim(pdp, punch_rim(self.segments))
+        assert_that(pdp.memory, equal_to(self.pal.planter.code))
@@ -0,0 +1,109 @@
+import contextlib
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, calling, raises
+
+from pdp8.core import PDP8, octal, HALTED
+from pdp8.devices import Clock, CLOCK
+from pdp8.pal import Pal
+from pdp8.timetravel import TimeMachine
+from pdp8.tracing import NullTracer
+from tests.helpers.files import read
+from tests.unit_tests.test_devices import CLOCK_PROGRAM
+
+
+class TimeMachineTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        self.pal.assemble(StringIO(read('hello.pal')))
+        self.image = list(self.pdp.memory)
+
+    def state(self, pdp):
+        return list(pdp.memory), pdp.pc, pdp.accumulator, pdp.link, pdp.output, pdp.cycles
+
+    def state_after(self, count):
+        pdp = PDP8()
+        pdp.memory = self.image
+        pdp.run(start=octal('200'), max_instructions=count)
+        return self.state(pdp)
+
+    def test_records_a_whole_run(self):
+        machine = TimeMachine(self.pdp, interval=10, checkpoints=100)
+        result = machine.record(start=octal('200'))
+        assert_that(result.status, equal_to(HALTED))
+        assert_that(self.pdp.output, equal_to('HELLO, WORLD!\r\n'))
+        assert_that(machine.end, equal_to(result.instructions))
+        assert_that(machine.checkpoints[1][0], equal_to(10))
+
+    def test_goes_to_any_instruction(self):
+        machine = TimeMachine(self.pdp, interval=10, checkpoints=100)
+        machine.record(start=octal('200'))
+        for count in [57, 3, 40, 41, 0, 99]:
+            machine.goto(count)
+            assert_that(self.state(self.pdp), equal_to(self.state_after(count)))
+
+    def test_steps_back(self):
+        machine = TimeMachine(self.pdp, interval=16, checkpoints=100)
+        machine.record(start=octal('200'), max_instructions=50)
+        machine.step_back()
+        assert_that(machine.count, equal_to(49))
+        assert_that(self.state(self.pdp), equal_to(self.state_after(49)))
+        machine.step(2)
+        assert_that(self.state(self.pdp), equal_to(self.state_after(51)))
+
+    def test_stops_at_the_halt(self):
+        machine = TimeMachine(self.pdp, interval=10, checkpoints=100)
+        with contextlib.redirect_stdout(StringIO()):
+            machine.record(start=octal('200'))
+            end = self.state(self.pdp)
+            machine.goto(machine.end - 20)
+            machine.goto(machine.end + 5)
+        assert_that(machine.count, equal_to(machine.end))
+        assert_that(self.state(self.pdp), equal_to(end))
+        assert_that(self.pdp.halted, equal_to(True))
+        machine.step()
+        assert_that(self.pdp.halted, equal_to(True))
+        assert_that(self.state(self.pdp), equal_to(end))
+
+    def test_replays_the_clock(self):
+        def clocked():
+            pdp = PDP8()
+            pdp.attach(CLOCK, Clock(50))
+            Pal(pdp).assemble(CLOCK_PROGRAM.splitlines())
+            return pdp
+        machine = TimeMachine(clocked(), interval=10, checkpoints=100)
+        machine.record(start=octal('200'))
+        for count in [68, 12, 95, 40, 41, 3]:
+            machine.goto(count)
+            fresh = clocked()
+            fresh.run(start=octal('200'), max_instructions=count)
+            assert_that(self.state(machine.pdp8), equal_to(self.state(fresh)))
+            assert_that(machine.pdp8.interrupt_enable, equal_to(fresh.interrupt_enable))
+
+    def test_only_recent_checkpoints_are_kept(self):
+        machine = TimeMachine(self.pdp, interval=10, checkpoints=3)
+        machine.record(start=octal('200'), max_instructions=100)
+        assert_that([checkpoint[0] for checkpoint in machine.checkpoints], equal_to([70, 80, 90]))
+        assert_that(calling(machine.goto).with_args(20), raises(ValueError))
+
+    def test_checkpoints_do_not_copy_the_tape_or_output(self):
+        def copier():
+            pdp = PDP8()
+            Pal(pdp).assemble(StringIO(read('copy.pal')))
+            pdp.tracer = NullTracer()
+            return pdp
+        tape = b'PDP8 ' * 2000 + b'.'
+        machine = TimeMachine(copier(), interval=5000, checkpoints=100)
+        stdout = StringIO()
+        with contextlib.redirect_stdout(stdout):
+            machine.record(start=octal('200'), tape=BytesIO(tape))
+        assert_that(stdout.getvalue(), equal_to(''))
+        assert_that(machine.pdp8.output, equal_to(tape[:-1].decode()))
+        assert_that(max(len(snapshot.data) for (_, snapshot, _) in machine.checkpoints) < 7000, equal_to(True))
+        for count in [machine.end - 7, 12345, 60000, 2]:
+            machine.goto(count)
+            fresh = copier()
+            fresh.run(start=octal('200'), tape=BytesIO(tape), max_instructions=count)
+            assert_that(self.state(machine.pdp8), equal_to(self.state(fresh)))
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, close_to
+
+from pdp8.core import PDP8, HALTED
+from pdp8.pal import Pal
+from pdp8.timing import TimingModel, Throttle, PDP8E, PDP8S
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TimingTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        for (location, text) in enumerate(['ISZ 5', 'JMP 0', 'HLT', '0', '0', '7000']):
+            self.pdp.memory[location] = self.pal.instruction(text, location)
+
+    def test_emulated_time_follows_cycles(self):
+        timing = TimingModel(self.pdp, PDP8S)
+        result = self.pdp.run()
+        assert_that(timing.microseconds(), close_to(result.cycles * 8.0, 1e-6))
+
+    def test_throttle_sleeps_once_per_slice(self):
+        fake = FakeClock()
+        throttle = Throttle(self.pdp, PDP8E, slice_time=0.001, clock=fake.clock, sleeper=fake.sleep)
+        result = throttle.run()
+        assert_that(result.status, equal_to(HALTED))
+        assert_that(result.instructions, equal_to(2 * 512))
+        assert_that(fake.now, close_to(result.cycles * 1.2e-6, 1e-9))
+        assert_that(len(fake.sleeps) < result.instructions / 100, 'sleeps should be batched')
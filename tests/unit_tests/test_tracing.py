@@ -0,0 +1,55 @@
+import contextlib
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.tracing import BinaryTraceRecorder, PrintingTracer, RECORD, decode_trace, render_trace
+from tests.helpers.files import read
+
+
+class BinaryTraceRecorderTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        self.pal.assemble(StringIO(read('mul-sub.pal')))
+        self.image = list(self.pdp.memory)
+
+    def printed_trace(self):
+        self.pdp.memory = self.image
+        printed = StringIO()
+        with contextlib.redirect_stdout(printed):
+            self.pdp.run(start=octal('200'), debugging=True, tracer=PrintingTracer(self.pal.planter.source))
+        return [line for line in printed.getvalue().splitlines() if line != 'Halted']
+
+    def recorded_trace(self, recorder):
+        self.pdp.memory = self.image
+        self.pdp.run(start=octal('200'), debugging=True, tracer=recorder)
+
+    def test_renders_like_printing_tracer(self):
+        recorder = BinaryTraceRecorder(BytesIO(), capacity=16)
+        self.recorded_trace(recorder)
+        rendered = list(render_trace(recorder.file.getvalue(), self.pal.planter.source))
+        assert_that(rendered, equal_to(self.printed_trace()))
+
+    def test_run_that_stops_early_writes_its_records(self):
+        recorder = BinaryTraceRecorder(BytesIO(), capacity=16)
+        self.pdp.run(start=octal('200'), debugging=True, tracer=recorder, max_instructions=20)
+        assert_that(len(recorder.file.getvalue()), equal_to(20 * RECORD.size))
+
+    def test_records_memory_writes(self):
+        recorder = BinaryTraceRecorder()
+        self.recorded_trace(recorder)
+        writes = [(address, contents) for (_, _, _, _, address, contents, flags) in decode_trace(recorder.records())
+                  if flags & 2]
+        assert_that(writes[-1], equal_to((136, 6)))
+
+    def test_ring_keeps_the_latest_records(self):
+        everything = BinaryTraceRecorder()
+        self.recorded_trace(everything)
+        ring = BinaryTraceRecorder(capacity=5)
+        self.recorded_trace(ring)
+        assert_that(ring.wrapped, equal_to(True))
+        assert_that(ring.records(), equal_to(everything.records()[-5 * RECORD.size:]))
@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to
+
+from pdp8.core import PDP8, octal
+from pdp8.pal import Pal
+from pdp8.tracing import HaltTracer
+from tests.helpers.checker import PDPChecker
+
+
+class TranslatorTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pdp.tracer = HaltTracer()
+        self.checker = PDPChecker(self.pdp)
+        self.pal = Pal(self.pdp)
+
+    def load(self, *program):
+        for (location, text) in enumerate(program):
+            self.pdp.memory[location] = self.pal.instruction(text, location)
+
+    def test_loop_runs_as_one_block(self):
+        self.load('TAD 10', 'ISZ 11', 'JMP 0', 'HLT')
+        self.pdp.memory[octal('10')] = 2
+        self.pdp.memory[octal('11')] = octal('7773')  # -5
+        self.pdp.run(translate=True)
+        self.checker.check(memory={octal('11'): 0}, pc=4, accumulator=10)
+        assert_that(self.pdp.tracer.halted)
+        assert_that(list(self.pdp.translator.blocks.keys()), equal_to([0, 3]))
+
+    def test_budget_is_respected_inside_loop(self):
+        self.load('ISZ 10', 'JMP 0')
+        executed = self.pdp.run_translated(max_instructions=9)
+        assert_that(executed, equal_to(9))
+        self.checker.check(memory={octal('10'): 5}, pc=1)
+
+    def test_store_into_code_invalidates_block(self):
+        self.load('CLA', 'TAD 10', 'DCA 3', 'NOP', 'HLT')
+        self.pdp.memory[octal('10')] = self.pal.instruction('IAC', 3)
+        self.pdp.run(translate=True)
+        self.checker.check(accumulator=1)
+
+    def test_jms_return_address_invalidates_block(self):
+        self.load('JMS 3', 'JMS 3', 'HLT', '0', 'JMP I 3')
+        self.pdp.run(translate=True)
+        self.checker.check(memory={3: 2}, pc=3)
+
+    def test_direct_memory_changes_are_seen_by_next_run(self):
+        self.load('IAC', 'HLT')
+        self.pdp.run(translate=True)
+        self.pdp.memory[0] = self.pal.instruction('CMA', 0)
+        self.pdp.pc = 0
+        self.pdp.run(translate=True)
+        self.checker.check(accumulator=octal('7776'))
+
+    def test_direct_memory_changes_are_seen_with_several_fields(self):
+        self.pdp = PDP8(fields=2)
+        self.checker = PDPChecker(self.pdp)
+        self.pdp.tracer = HaltTracer()
+        self.test_direct_memory_changes_are_seen_by_next_run()
+
+    def stepped(self, *program):
+        pdp = PDP8()
+        pdp.tracer = HaltTracer()
+        pal = Pal(pdp)
+        for (location, text) in enumerate(program):
+            pdp.memory[location] = pal.instruction(text, location)
+        while not pdp.tracer.halted:
+            pdp.run(stepping=True)
+        return (list(pdp.memory), pdp.pc, pdp.accumulator, pdp.link)
+
+    def translated(self, *program):
+        self.load(*program)
+        self.pdp.run(translate=True)
+        return (list(self.pdp.memory), self.pdp.pc, self.pdp.accumulator, self.pdp.link)
+
+    def test_jmp_changed_by_the_isz_before_it_is_not_fused(self):
+        program = ('ISZ 1', 'JMP 3', 'HLT', 'HLT', 'IAC', 'HLT')
+        assert_that(self.translated(*program), equal_to(self.stepped(*program)))
+        self.checker.check(pc=6, accumulator=1)
+
+    def test_jmp_after_an_indirect_isz_is_not_fused(self):
+        program = ('ISZ I 6', 'JMP 3', 'HLT', 'HLT', 'IAC', 'HLT', '1')
+        assert_that(self.translated(*program), equal_to(self.stepped(*program)))
+        self.checker.check(pc=6, accumulator=1)
+
+    def test_words_stored_into_are_interpreted(self):
+        program = ('CLA', 'TAD 10', 'DCA 3', 'NOP', 'ISZ 11', 'JMP 0', 'HLT', '0', 'IAC', '7775')
+        assert_that(self.translated(*program), equal_to(self.stepped(*program)))
+        self.checker.check(pc=7, accumulator=1)
+        assert_that(self.pdp.translator.stored, equal_to({3}))
+        assert_that(self.pdp.translator.blocks[3].function, equal_to(None))
+        assert_that(self.pdp.translator.blocks[0].last, equal_to(2))
+
+    def test_blocks_run_on_past_stores_outside_them(self):
+        self.load('CLA', 'TAD 10', 'DCA 11', 'TAD 10', 'HLT')
+        self.pdp.memory[octal('10')] = 3
+        self.pdp.run(translate=True)
+        self.checker.check(memory={octal('11'): 3}, pc=5, accumulator=3)
+        assert_that(list(self.pdp.translator.blocks.keys()), equal_to([0]))
+
+    def test_machines_share_compiled_blocks(self):
+        self.load('TAD 10', 'ISZ 11', 'JMP 0', 'HLT')
+        other = PDP8()
+        other.memory = self.pdp.memory
+        other.tracer = HaltTracer()
+        self.pdp.run(translate=True)
+        other.run(translate=True)
+        assert_that(other.translator.blocks[0].function is self.pdp.translator.blocks[0].function, equal_to(True))
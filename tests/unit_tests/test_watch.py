@@ -0,0 +1,97 @@
+import contextlib
+from io import StringIO
+from unittest import TestCase
+
+from hamcrest import assert_that, equal_to, instance_of
+
+from pdp8.core import PDP8, HALTED, STOPPED, octal
+from pdp8.pal import Pal
+from pdp8.watch import Watcher, WatchedPDP8, Hit, READ, WRITE, EXECUTE
+from tests.helpers.files import read
+
+
+class WatcherTest(TestCase):
+    def setUp(self):
+        self.pdp = PDP8()
+        self.pal = Pal(self.pdp)
+        with contextlib.redirect_stdout(StringIO()):
+            self.pal.assemble(StringIO(read('mult.pal')))
+        self.watcher = Watcher(self.pdp)
+
+    def run_watched(self, translate=False):
+        with self.watcher, contextlib.redirect_stdout(StringIO()):
+            return self.pdp.run(start=octal('200'), translate=translate)
+
+    def test_counts_accesses(self):
+        self.watcher.stop_on_hit = False
+        result = self.run_watched()
+        assert_that(result.status, equal_to(HALTED))
+        assert_that(sum(self.watcher.executions), equal_to(result.instructions))
+        assert_that(self.watcher.executions[octal('204')], equal_to(18))
+        assert_that(self.watcher.reads[octal('211')], equal_to(18))
+        assert_that(self.watcher.reads[octal('212')], equal_to(18))
+        assert_that(self.watcher.writes[octal('212')], equal_to(19))
+
+    def test_stops_after_a_watched_write(self):
+        self.watcher.watch(octal('212'), kinds=WRITE)
+        result = self.run_watched()
+        assert_that(result.status, equal_to(STOPPED))
+        assert_that(self.watcher.hits, equal_to([Hit(WRITE, octal('212'), octal('203'), octal('7756'))]))
+        assert_that(self.pdp.pc, equal_to(octal('204')))
+
+    def test_carries_on_after_a_hit(self):
+        self.watcher.watch(octal('212'), kinds=WRITE)
+        self.run_watched()
+        with self.watcher:
+            result = self.pdp.run(tape=None)
+        assert_that(result.status, equal_to(STOPPED))
+        assert_that(self.watcher.hits[-1], equal_to(Hit(WRITE, octal('212'), octal('205'), octal('7757'))))
+
+    def test_watches_a_range_in_translated_runs(self):
+        self.watcher.watch(octal('206'), octal('207'), kinds=EXECUTE)
+        result = self.run_watched(translate=True)
+        assert_that(result.status, equal_to(STOPPED))
+        assert_that(self.watcher.hits, equal_to([Hit(EXECUTE, octal('206'), octal('206'), octal('5004'))]))
+        assert_that(self.pdp.pc, equal_to(octal('204')))
+
+    def test_records_without_stopping(self):
+        watcher = Watcher(self.pdp, stop=False)
+        watcher.watch(octal('211'), kinds=READ)
+        with watcher, contextlib.redirect_stdout(StringIO()):
+            result = self.pdp.run(start=octal('200'))
+        assert_that(result.status, equal_to(HALTED))
+        assert_that(len(watcher.hits), equal_to(18))
+        assert_that(watcher.hottest(READ, limit=1), equal_to([(octal('211'), 18)]))
+
+    def test_indirect_pointers_are_read(self):
+        self.pdp[octal('10')] = octal('300')
+        self.pdp.deposit(octal('200'), [octal('1610'), octal('7402')])
+        self.watcher.watch(octal('10'), kinds=READ)
+        with self.watcher, contextlib.redirect_stdout(StringIO()):
+            self.pdp.run(start=octal('200'))
+        assert_that(self.watcher.hits, equal_to([Hit(READ, octal('10'), octal('200'), octal('300'))]))
+
+    def test_unwatched_machine_is_plain(self):
+        with self.watcher:
+            assert_that(self.pdp, instance_of(WatchedPDP8))
+        assert_that(type(self.pdp), equal_to(PDP8))
+        assert_that(hasattr(self.pdp, 'watcher'), equal_to(False))
+
+    def test_subclass_keeps_its_methods_while_watched(self):
+        class CustomPDP8(PDP8):
+            def iot(self):
+                self.accumulator = octal('1234')
+        pdp = CustomPDP8()
+        pdp.deposit(octal('200'), [octal('6000'), octal('7402')])
+        watcher = Watcher(pdp)
+        with watcher, contextlib.redirect_stdout(StringIO()):
+            assert_that(pdp, instance_of(WatchedPDP8))
+            assert_that(pdp, instance_of(CustomPDP8))
+            pdp.run(start=octal('200'))
+        assert_that(pdp.accumulator, equal_to(octal('1234')))
+        assert_that(watcher.executions[octal('200')], equal_to(1))
+        assert_that(type(pdp), equal_to(CustomPDP8))
+
+    def test_stopping_an_idle_watcher_does_nothing(self):
+        self.watcher.stop()
+        assert_that(type(self.pdp), equal_to(PDP8))